@@ -1,7 +1,7 @@
 import os
 from flask import Flask, session, redirect, url_for, request, render_template, flash
 from config import DevelopmentConfig
-from db import db, migrate
+from db import db, migrate, configure_sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from routes import main, forms
@@ -21,14 +21,29 @@ def create_app(config_class=DevelopmentConfig):
     migrate.init_app(app, db)
 
     with app.app_context():
+        configure_sqlite(app)
         from models import create_tables
+        from stats import ensure_form_stats
         create_tables()
+        ensure_form_stats()
+
+    @app.cli.command("rebuild-form-stats")
+    def rebuild_form_stats_command():
+        """Recount form_stats from the record tables to fix any drift."""
+        from stats import rebuild_form_stats
+        for form, values in rebuild_form_stats().items():
+            print(f"{form}: {values['total']} records, {values['unsynced']} unsynced")
 
     # Register blueprints
     
     app.register_blueprint(main.bp)
     app.register_blueprint(forms.bp)
 
+    # Start background Google Sheets sync
+    if app.config.get("SYNC_WORKER_ENABLED"):
+        from sync_worker import worker
+        worker.start(app)
+
     #Add simple login routes
     @app.route("/login", methods=["GET", "POST"])
     def login():
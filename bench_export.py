@@ -0,0 +1,105 @@
+"""
+Benchmark the all-forms Excel export on a seeded in-memory database.
+
+Compares the previous download_all path (ORM instances -> __dict__ ->
+pandas DataFrame -> to_excel into a BytesIO) with exports.write_workbook
+(column-projected Core select with yield_per -> typed xlsxwriter writes
+in constant_memory mode), and times the export cache cold, unchanged and
+after one form changed (a full rebuild).
+
+    python bench_export.py --rows 12500        # 8 forms x 12,500 = 100k rows
+    python bench_export.py --rows 12500 --skip-orm
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=12500, help="rows seeded per form (8 forms)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows fetched per round trip")
+    parser.add_argument("--skip-orm", action="store_true", help="only time the Core export")
+    return parser.parse_args()
+
+
+def orm_export(db, forms, path):
+    """The download_all implementation this benchmark replaces."""
+    import pandas as pd
+
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        for model, sheet_name in forms:
+            records = model.query.all()
+            if records:
+                df = pd.DataFrame([r.__dict__ for r in records])
+                if "_sa_instance_state" in df.columns:
+                    df = df.drop(columns=["_sa_instance_state"])
+            else:
+                df = pd.DataFrame(columns=["No Data"])
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+
+
+def timed(label, total_rows, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed:>7.2f}s  {total_rows / elapsed:>10,.0f} rows/s")
+    return elapsed
+
+
+def main():
+    args = parse_args()
+
+    # Settings are read at import time: keep the runtime dir out of real data
+    home = tempfile.mkdtemp(prefix="datacollect-bench-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    os.environ["SYNC_WORKER_ENABLED"] = "0"
+
+    from sqlalchemy import insert
+    from app import create_app
+    from config import TestingConfig
+    from db import db
+    from models import FORM_MODELS
+    from exports import write_workbook, observation_column
+    from export_cache import cached_workbook
+
+    app = create_app(TestingConfig)
+    with app.app_context():
+        for model, _ in FORM_MODELS:
+            observed = observation_column(model)
+            rows = []
+            for i in range(args.rows):
+                row = {
+                    "crop": f"Crop {i % 5 + 1}", "genotype": f"Genotype {i % 90 + 1}",
+                    "replication": f"Replication {i % 3 + 1}", "synced": i % 2 == 0,
+                }
+                if observed is not None:
+                    row[observed.key] = date(2024, 1 + i % 12, 1 + i % 28)
+                rows.append(row)
+            db.session.execute(insert(model), rows)
+        db.session.commit()
+        total_rows = args.rows * len(FORM_MODELS)
+        print(f"Seeded {total_rows:,} rows across {len(FORM_MODELS)} forms")
+
+        out = os.path.join(home, "export.xlsx")
+        core = timed("core select + stream", total_rows,
+                     lambda: write_workbook(out, db.session, args.chunk_size))
+
+        cache_dir = os.path.join(home, "export_cache")
+        timed("cache: cold", total_rows, lambda: cached_workbook(db.session, cache_dir, args.chunk_size))
+        timed("cache: unchanged", total_rows, lambda: cached_workbook(db.session, cache_dir, args.chunk_size))
+        model = FORM_MODELS[0][0]
+        db.session.execute(insert(model), [{"crop": "Crop 1"}])
+        db.session.commit()
+        timed("cache: one form changed", total_rows, lambda: cached_workbook(db.session, cache_dir, args.chunk_size))
+        if not args.skip_orm:
+            db.session.expunge_all()
+            orm = timed("orm + pandas (old)", total_rows,
+                        lambda: orm_export(db, FORM_MODELS, os.path.join(home, "export_orm.xlsx")))
+            print(f"speedup: {orm / core:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
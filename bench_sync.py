@@ -0,0 +1,87 @@
+"""
+Benchmark Google Sheets sync against the in-process fake backend (no network).
+
+Seeds an in-memory database with unsynced rows for every form, syncs them and
+reports API calls per record and rows per second.
+
+    python bench_sync.py --rows 2000 --latency-ms 80 --quota 60
+    python bench_sync.py --rows 200 --mode single   # old per-record path
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="unsynced rows seeded per form")
+    parser.add_argument("--mode", choices=["batch", "single"], default="batch",
+                        help="batch = sync_pending, single = sync_to_sheets per record")
+    parser.add_argument("--latency-ms", type=int, default=50, help="emulated latency per API call")
+    parser.add_argument("--quota", type=int, default=0,
+                        help="emulated requests/minute quota, also used by the limiter (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls failing with 503")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per append_rows call")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Settings are read at import time: configure before importing the app.
+    # A throwaway home dir keeps the sheet index and runtime DB out of real data.
+    home = tempfile.mkdtemp(prefix="datacollect-bench-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    os.environ["SHEETS_BATCH_SIZE"] = str(args.batch_size)
+    per_minute = str(args.quota or 1_000_000)
+    os.environ["SHEETS_READS_PER_MINUTE"] = os.environ["SHEETS_WRITES_PER_MINUTE"] = per_minute
+
+    from app import create_app
+    from config import TestingConfig
+    from db import db
+    from models import FORM_MODELS
+    from sheets_utils import sync_pending, sync_to_sheets
+    from sync_backends import FakeSheetsBackend, set_backend
+
+    backend = FakeSheetsBackend(latency_ms=args.latency_ms, quota_per_minute=args.quota,
+                                error_rate=args.error_rate, seed=1)
+    set_backend(backend)
+
+    app = create_app(TestingConfig)
+    with app.app_context():
+        for model, _ in FORM_MODELS:
+            db.session.add_all(
+                model(crop="Crop 1", genotype=f"Genotype {i % 90 + 1}", replication="Replication 1")
+                for i in range(args.rows)
+            )
+        db.session.commit()
+
+        total_rows = 0
+        started = time.perf_counter()
+        for model, sheet in FORM_MODELS:
+            sheet_started = time.perf_counter()
+            calls_before = backend.api_calls()
+            if args.mode == "batch":
+                synced, _ = sync_pending(model, sheet)
+            else:
+                synced = 0
+                for row in db.session.query(model).filter_by(synced=False).all():
+                    if sync_to_sheets(row, sheet):
+                        synced += 1
+            elapsed = time.perf_counter() - sheet_started
+            calls = backend.api_calls() - calls_before
+            total_rows += synced
+            print(f"{sheet:22} {synced:7d} rows  {calls:6d} calls  {elapsed:8.2f}s")
+        elapsed = time.perf_counter() - started
+
+    calls = backend.api_calls()
+    print("-" * 60)
+    print(f"mode={args.mode} rows={total_rows} api_calls={calls} "
+          f"calls/record={calls / max(total_rows, 1):.3f} "
+          f"throughput={total_rows / elapsed:.1f} rows/s "
+          f"quota_errors={backend.calls['quota_errors']} server_errors={backend.calls['server_errors']}")
+
+
+if __name__ == "__main__":
+    main()
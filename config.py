@@ -9,6 +9,20 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 # Example Google Sheet ID (keep or override via env var)
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID", "1ducwMEA-YrN9BAD6VJ-a9xNIxLr6wqNbVkg_7_UKggs")
 
+# Max rows pushed to a worksheet in one append_rows call
+SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", "500"))
+
+# Rows per executemany INSERT when importing field-book files
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Rows fetched per round trip when exporting to Excel
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# Sheets API per-user quotas (requests per minute) and retry budget for 429/5xx
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+
 # Detect if running from PyInstaller bundle
 if getattr(sys, "frozen", False):
     bundle_dir = sys._MEIPASS  # PyInstaller unpack dir
@@ -40,11 +54,46 @@ if not os.path.exists(RUNTIME_DB_PATH):
     else:
         print("No bundled database found; starting fresh.")
 
+# --- Sync backend ---
+# "gspread" (live Google Sheet), "fake" (in-process stand-in), "csv" or "parquet" (file sink)
+SYNC_BACKEND = os.getenv("SYNC_BACKEND", "gspread")
+SYNC_FILE_DIR = os.getenv("SYNC_FILE_DIR", os.path.join(user_dir, "sheets_export"))
+FAKE_SHEETS_LATENCY_MS = int(os.getenv("FAKE_SHEETS_LATENCY_MS", "0"))
+FAKE_SHEETS_QUOTA_PER_MINUTE = int(os.getenv("FAKE_SHEETS_QUOTA_PER_MINUTE", "0"))
+FAKE_SHEETS_ERROR_RATE = float(os.getenv("FAKE_SHEETS_ERROR_RATE", "0"))
+
+# Cached all-forms workbooks, reused until a table changes
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(user_dir, "export_cache"))
+# Finished background export files, kept until EXPORT_JOB_TTL_SECONDS
+EXPORT_JOB_DIR = os.getenv("EXPORT_JOB_DIR", os.path.join(user_dir, "export_jobs"))
+
 # --- Config Classes ---
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")  # change in production
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Background Google Sheets sync (outbox worker)
+    SYNC_WORKER_ENABLED = os.getenv("SYNC_WORKER_ENABLED", "1") == "1"
+    SYNC_POLL_SECONDS = int(os.getenv("SYNC_POLL_SECONDS", "30"))
+    SYNC_RETRY_BASE_SECONDS = int(os.getenv("SYNC_RETRY_BASE_SECONDS", "30"))
+    SYNC_RETRY_MAX_SECONDS = int(os.getenv("SYNC_RETRY_MAX_SECONDS", "3600"))
+    # Max age of the in-process dashboard cache (bounds staleness across workers)
+    DASHBOARD_CACHE_SECONDS = int(os.getenv("DASHBOARD_CACHE_SECONDS", "60"))
+    # Worksheets synced concurrently by sync_all
+    SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "4"))
+    # Background export jobs: concurrent builds and how long results are kept
+    EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "1"))
+    EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+
+    # SQLite connection profile (ignored for other databases).
+    # WAL lets dashboard reads run alongside form writes from several workers;
+    # busy_timeout makes a writer wait for the lock instead of failing.
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB, so 64 MiB
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -53,10 +102,36 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    SYNC_WORKER_ENABLED = False
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
 
 
+def database_url(url):
+    """Normalize a DATABASE_URL: SQLAlchemy 2 only accepts the postgresql:// scheme."""
+    if url and url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
 class ProductionConfig(Config):
     DEBUG = False
     # Prefer DATABASE_URL (e.g., Postgres on Render), else fallback to SQLite
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", f"sqlite:///{RUNTIME_DB_PATH}")
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = database_url(os.getenv("DATABASE_URL", f"sqlite:///{RUNTIME_DB_PATH}"))
+
+    # Connection pool (applies to every engine, including the read bind).
+    # pre_ping drops connections the server closed; recycle stays under
+    # the provider's idle timeout.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    if not SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        })
+
+    # Optional read replica for heavy read-only views (exports, activity feed)
+    if os.getenv("DATABASE_READ_URL"):
+        SQLALCHEMY_BINDS = {"read": database_url(os.getenv("DATABASE_READ_URL"))}
\ No newline at end of file
@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# In-process cache of the dashboard template context.
+# A generation counter is bumped whenever a transaction that changed record
+# tables commits (stats.adjust_form_stats flags the connection), which covers
+# form handlers, sync runs and imports. The max age bounds staleness from
+# writes made by other worker processes.
+
+_PROCESS_ID = uuid.uuid4().hex[:8]  # keeps ETags from different workers apart
+_CHANGED_FLAG = "dashboard_changed"
+
+_lock = threading.Lock()
+_generation = 0
+_changed_at = datetime.now(timezone.utc).replace(microsecond=0)
+_cached = None  # (generation, stored at monotonic time, context)
+
+
+def mark_changed(connection):
+    """Flag a connection's transaction as changing dashboard data."""
+    connection.info[_CHANGED_FLAG] = True
+
+
+def bump():
+    global _generation, _changed_at
+    with _lock:
+        _generation += 1
+        _changed_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def generation():
+    return _generation
+
+
+def etag():
+    return f"{_PROCESS_ID}-{_generation}"
+
+
+def last_modified():
+    return _changed_at
+
+
+def _current(max_age):
+    if _cached is not None and _cached[0] == _generation and time.monotonic() - _cached[1] < max_age:
+        return _cached[2]
+    return None
+
+
+def is_fresh(max_age):
+    """True if the cached context is current and younger than max_age seconds."""
+    with _lock:
+        return _current(max_age) is not None
+
+
+def get(max_age):
+    with _lock:
+        return _current(max_age)
+
+
+def put(computed_generation, context):
+    """
+    Store a freshly computed context. Skipped if a write landed meanwhile.
+    A recompute after expiry that finds nothing changed keeps the same
+    generation, so clients' ETags stay valid.
+    """
+    global _cached, _generation, _changed_at
+    with _lock:
+        if computed_generation != _generation:
+            return
+        if _cached is not None and _cached[0] == _generation and _cached[2] != context:
+            _generation += 1
+            _changed_at = datetime.now(timezone.utc).replace(microsecond=0)
+        _cached = (_generation, time.monotonic(), context)
+
+
+@event.listens_for(Engine, "commit")
+def _on_commit(connection):
+    if connection.info.pop(_CHANGED_FLAG, False):
+        bump()
+
+
+@event.listens_for(Engine, "rollback")
+def _on_rollback(connection):
+    connection.info.pop(_CHANGED_FLAG, None)
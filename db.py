@@ -1,5 +1,52 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 db = SQLAlchemy()
 migrate = Migrate()
+
+
+def configure_sqlite(app):
+    """
+    Apply the SQLITE_* pragmas from the app config to every new connection of
+    the app's SQLite engines. Must run inside an app context.
+    """
+    for engine in db.engines.values():
+        if engine.dialect.name != "sqlite":
+            continue
+        in_memory = engine.url.database in (None, "", ":memory:")
+
+        @event.listens_for(engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record, in_memory=in_memory):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA busy_timeout = {int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+            cursor.execute(f"PRAGMA cache_size = {int(app.config['SQLITE_CACHE_SIZE'])}")
+            if not in_memory:
+                # journal mode is stored in the file; WAL needs a real file
+                cursor.execute(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+                cursor.execute(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS']}")
+                cursor.execute(f"PRAGMA mmap_size = {int(app.config['SQLITE_MMAP_SIZE'])}")
+            cursor.close()
+
+
+def read_engine():
+    """Engine for read-only views: the "read" bind when configured, else the primary."""
+    return db.engines.get("read", db.engine)
+
+
+@contextmanager
+def read_session():
+    """
+    Session for views that never write: a short-lived one on the "read" bind
+    when configured, else the regular request session.
+    """
+    if "read" not in db.engines:
+        yield db.session
+        return
+    session = Session(read_engine())
+    try:
+        yield session
+    finally:
+        session.close()
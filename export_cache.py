@@ -0,0 +1,95 @@
+"""
+On-disk cache for the all-forms Excel export.
+
+The workbook is cached under a key built from every table's change marker
+(row count, max id, max created_at, unsynced count; the last one catches
+rows flipped to synced). While nothing changed the cached workbook is served
+as is; any change rebuilds it straight from the database.
+Files are written under a temp name and renamed into place, so concurrent
+downloads never see half-written artifacts. The previous workbook is kept
+when a new one is published, so a download that already picked its path can
+still open it.
+"""
+import hashlib
+import os
+import uuid
+from sqlalchemy import select, literal, func, case, union_all
+from models import FORM_MODELS, unsynced
+from config import EXPORT_CACHE_DIR
+from exports import write_workbook
+
+CACHE_VERSION = 1  # bump when the workbook layout changes
+KEEP_WORKBOOKS = 2  # newest published workbooks kept on disk
+
+
+def table_markers(session):
+    """{form label: (count, max id, max created_at, unsynced)} in one UNION ALL query."""
+    query = union_all(*[
+        select(
+            literal(label).label("form"),
+            func.count(model.id).label("total"),
+            func.max(model.id).label("max_id"),
+            func.max(model.created_at).label("max_created_at"),
+            func.coalesce(func.sum(case((unsynced(model), 1), else_=0)), 0).label("unsynced"),
+        )
+        for model, label in FORM_MODELS
+    ])
+    return {
+        row.form: (row.total, row.max_id, str(row.max_created_at), row.unsynced)
+        for row in session.execute(query)
+    }
+
+
+def _key(*parts):
+    return hashlib.sha1(repr((CACHE_VERSION,) + parts).encode()).hexdigest()[:16]
+
+
+def _publish(tmp_path, path, directory):
+    """Move a finished workbook into place and drop all but the newest ones."""
+    os.replace(tmp_path, path)
+    workbooks = [
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith("workbook-") and name.endswith(".xlsx")
+    ]
+    workbooks.sort(key=os.path.getmtime, reverse=True)
+    for old in workbooks[KEEP_WORKBOOKS:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass  # still being served (Windows); removed next time
+
+
+def cached_workbook(session, directory=None, chunk_size=None, progress=None):
+    """
+    Path of an up-to-date all-forms workbook.
+    The file stays in the cache: callers must not delete it.
+    progress(sheet name, rows written, total rows) reports the build.
+    """
+    directory = directory or EXPORT_CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    markers = table_markers(session)
+    path = os.path.join(directory, f"workbook-{_key(sorted(markers.items()))}.xlsx")
+    if os.path.exists(path):
+        if progress is not None:
+            for label, marker in markers.items():
+                progress(label, marker[0], marker[0])
+        return path
+
+    sheet_progress = None
+    if progress is not None:
+        for label, marker in markers.items():
+            progress(label, 0, marker[0])
+
+        def sheet_progress(label, rows):
+            progress(label, rows, markers[label][0])
+
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        write_workbook(tmp_path, session, chunk_size, progress=sheet_progress)
+        _publish(tmp_path, path, directory)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print("Export cache: rebuilt workbook")
+    return path
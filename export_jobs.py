@@ -0,0 +1,166 @@
+"""
+Background export jobs.
+
+Creating a job stores an ExportJob row and hands it to a small thread pool in
+this process, so the request returns at once. The job builds the all-forms
+workbook through the export cache and records rows written per sheet in the
+job row, so any web worker can answer status polls. The finished file is
+copied to EXPORT_JOB_DIR and removed, with its row, EXPORT_JOB_TTL_SECONDS
+after the job finished. The TTL also bounds a job's run time: a job still
+queued or running that long after creation (e.g. orphaned by a restart) is
+reported failed, and expires one TTL later.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy import select, update, delete, func
+from db import db, read_session
+from models import ExportJob, Kampala_time
+from config import EXPORT_JOB_DIR
+from export_cache import cached_workbook
+
+PROGRESS_INTERVAL = 0.5  # min seconds between progress writes
+FINISHED = ("done", "failed")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _now():
+    # Naive Kampala time, matching how DateTime columns are stored
+    return Kampala_time().replace(tzinfo=None)
+
+
+def _get_executor(max_workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-job")
+        return _executor
+
+
+def create_job(app):
+    """Store a queued export job, start it in the background and return it."""
+    cleanup_expired(app.config["EXPORT_JOB_TTL_SECONDS"])
+    job = ExportJob(id=str(uuid.uuid4()), status="queued")
+    db.session.add(job)
+    db.session.commit()
+    _get_executor(app.config["EXPORT_JOB_WORKERS"]).submit(run_job, app, job.id)
+    return job
+
+
+def _update_job(job_id, **values):
+    """Update a running job; False if it is no longer running (failed by cleanup)."""
+    # Own short transaction on the primary: never commits the export's read session
+    table = ExportJob.__table__
+    status = "queued" if values.get("status") == "running" else "running"
+    with db.engine.begin() as connection:
+        return connection.execute(
+            update(table).where(table.c.id == job_id, table.c.status == status).values(**values)
+        ).rowcount == 1
+
+
+def run_job(app, job_id):
+    """Build the workbook for a job (runs on the export pool)."""
+    with app.app_context():
+        sheets = {}
+        last_write = 0.0
+
+        def progress(sheet, rows, total):
+            nonlocal last_write
+            sheets[sheet] = {"rows": rows, "total": total}
+            now = time.monotonic()
+            if now - last_write >= PROGRESS_INTERVAL:
+                last_write = now
+                _update_job(job_id, progress=json.dumps(sheets))
+
+        try:
+            if not _update_job(job_id, status="running"):
+                return  # failed by cleanup while it waited in the queue
+            with read_session() as session:
+                source = cached_workbook(session, progress=progress)
+
+            # Copy: the cached workbook is replaced as soon as any form changes
+            os.makedirs(EXPORT_JOB_DIR, exist_ok=True)
+            path = os.path.join(EXPORT_JOB_DIR, f"{job_id}.xlsx")
+            shutil.copyfile(source, path)
+            if _update_job(job_id, status="done", progress=json.dumps(sheets), path=path, finished_at=_now()):
+                print(f"Export job {job_id} done")
+            else:
+                os.remove(path)  # timed out meanwhile: nobody can download it
+
+        except Exception as e:
+            print(f"Export job {job_id} failed: {e}")
+            _update_job(job_id, status="failed", error=str(e), finished_at=_now())
+        finally:
+            db.session.remove()
+
+
+def job_status(job):
+    """JSON-ready status of a job with per-sheet and overall row counts."""
+    sheets = json.loads(job.progress) if job.progress else {}
+    return {
+        "id": job.id,
+        "status": job.status,
+        "sheets": sheets,
+        "rows": sum(sheet["rows"] for sheet in sheets.values()),
+        "total": sum(sheet["total"] for sheet in sheets.values()),
+        "error": job.error,
+    }
+
+
+def get_job(job_id, ttl_seconds):
+    """The job, or None if unknown or past its TTL. Applies the TTL to all jobs first."""
+    cleanup_expired(ttl_seconds)
+    job = db.session.get(ExportJob, job_id)
+    if job is None or (job.status in FINISHED and (job.finished_at or job.created_at) < _cutoff(ttl_seconds)):
+        return None  # file could not be removed yet (Windows); expired all the same
+    return job
+
+
+def _cutoff(ttl_seconds):
+    return _now() - timedelta(seconds=ttl_seconds)
+
+
+def cleanup_expired(ttl_seconds):
+    """
+    Delete jobs (and their files) that finished more than ttl_seconds ago,
+    and mark jobs still queued or running that long after creation as failed.
+    Core statements: several workers may run this at once.
+    """
+    cutoff = _cutoff(ttl_seconds)
+    table = ExportJob.__table__
+
+    expired = db.session.execute(
+        select(table.c.id, table.c.path).where(
+            func.coalesce(table.c.finished_at, table.c.created_at) < cutoff,
+            table.c.status.in_(FINISHED),
+        )
+    ).all()
+    removed = []
+    for job_id, path in expired:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # still being downloaded (Windows); try again next time
+        removed.append(job_id)
+    if removed:
+        db.session.execute(delete(table).where(table.c.id.in_(removed)))
+
+    # Never finishing: orphaned by a process restart, or over the time limit
+    stuck = db.session.execute(
+        update(table)
+        .where(table.c.created_at < cutoff, table.c.status.in_(("queued", "running")))
+        .values(status="failed", error="Export did not finish in time; please start a new one",
+                finished_at=_now())
+    ).rowcount
+
+    if removed or stuck:
+        db.session.commit()
+        print(f"Export jobs: removed {len(removed)} expired, failed {stuck} stuck")
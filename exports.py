@@ -0,0 +1,279 @@
+"""
+Exports of the record tables.
+
+- Excel, all forms: rows are read in chunks (yield_per) as plain tuples from
+  a column-projected Core select (no ORM objects) and written with
+  xlsxwriter's constant_memory mode, which flushes each finished row to disk,
+  so memory stays flat however many seasons of data the tables hold.
+- Per form, for analysis: CSV streamed chunk by chunk, or typed Parquet /
+  Arrow IPC files written one record batch per chunk. Filters (date ranges,
+  crop, genotype, block, synced) are pushed down into SQL.
+
+Files are built in a temp file that is streamed to the client and then deleted.
+"""
+import csv
+import io
+import os
+import tempfile
+from datetime import date, timedelta
+import xlsxwriter
+from werkzeug.wsgi import ClosingIterator
+from sqlalchemy import select, inspect, true, false, Boolean, Integer, Float, Date, DateTime
+from models import FORM_MODELS
+from config import EXPORT_CHUNK_SIZE
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def export_columns(model):
+    """Columns exported for a model, in mapper order."""
+    return list(inspect(model).columns)
+
+
+def _cell_writers(workbook, worksheet, columns):
+    """
+    One typed xlsxwriter call per column, picked once per sheet instead of
+    letting write() sniff every value.
+    """
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    writers = []
+    for column in columns:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            writers.append((worksheet.write_boolean, None))
+        elif isinstance(column_type, (Integer, Float)):
+            writers.append((worksheet.write_number, None))
+        elif isinstance(column_type, DateTime):
+            writers.append((worksheet.write_datetime, None))  # workbook default_date_format
+        elif isinstance(column_type, Date):
+            writers.append((worksheet.write_datetime, date_format))
+        else:
+            # write_string: text such as "=1+2" stays text, never a formula
+            writers.append((worksheet.write_string, None))
+    return writers
+
+
+def write_sheet(workbook, worksheet, model, chunks, progress=None):
+    """
+    Write a header and then every row of every chunk. Returns the row count.
+    progress(rows written so far) is called after each chunk.
+    """
+    columns = export_columns(model)
+    worksheet.write_row(0, 0, [column.key for column in columns])
+    writers = list(enumerate(_cell_writers(workbook, worksheet, columns)))
+
+    row_index = 0
+    for rows in chunks:
+        for row in rows:
+            row_index += 1
+            for col_index, (write, cell_format) in writers:
+                value = row[col_index]
+                if value is not None:
+                    write(row_index, col_index, value, cell_format)
+        if progress is not None:
+            progress(row_index)
+    return row_index
+
+
+def write_workbook(path, session, chunk_size=None, progress=None):
+    """
+    Write one worksheet per form to path, reading rows from the database.
+    progress(sheet_name, rows written) is called as each sheet advances.
+    Returns {sheet name: rows written}.
+    """
+    counts = {}
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "remove_timezone": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        # Float columns accept "inf"/"nan" from forms and imports: write
+        # them as Excel errors instead of failing the whole export
+        "nan_inf_to_errors": True,
+    })
+    try:
+        for model, sheet_name in FORM_MODELS:
+            worksheet = workbook.add_worksheet(sheet_name)
+            sheet_progress = None
+            if progress is not None:
+                sheet_progress = lambda rows, sheet_name=sheet_name: progress(sheet_name, rows)
+            counts[sheet_name] = write_sheet(workbook, worksheet, model,
+                                             iter_chunks(session, model, (), chunk_size), sheet_progress)
+    finally:
+        workbook.close()
+    return counts
+
+
+def stream_and_delete(path, chunk_size=64 * 1024):
+    """
+    Response body that streams a file in chunks and deletes it when the
+    server closes the response, even if the client left before reading it.
+    """
+    def chunks():
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def remove():
+        if os.path.exists(path):
+            os.remove(path)
+
+    return ClosingIterator(chunks(), remove)
+
+
+# --- Per-form filtered exports ---
+
+COLUMNAR_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+# Exact-match filters: query parameter -> column
+MATCH_FILTERS = ("crop", "genotype", "block")
+
+
+def observation_column(model):
+    """The model's own observation date column (observation_date / date), if any."""
+    for column in model.__table__.columns:
+        if isinstance(column.type, Date) and not isinstance(column.type, DateTime):
+            return column
+    return None
+
+
+def _parse_day(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD") from None
+
+
+def export_filters(model, args):
+    """
+    SQL conditions for an export from query parameters:
+    created_from / created_to (days, inclusive), observed_from / observed_to
+    (on the form's observation date), crop, genotype, block and synced.
+    Raises ValueError on a bad or unsupported filter.
+    """
+    table = model.__table__
+    conditions = []
+
+    created_from, created_to = _parse_day(args, "created_from"), _parse_day(args, "created_to")
+    if created_from:
+        conditions.append(table.c.created_at >= created_from)
+    if created_to:
+        conditions.append(table.c.created_at < created_to + timedelta(days=1))
+
+    observed_from, observed_to = _parse_day(args, "observed_from"), _parse_day(args, "observed_to")
+    if observed_from or observed_to:
+        observed = observation_column(model)
+        if observed is None:
+            raise ValueError("this form has no observation date")
+        if observed_from:
+            conditions.append(observed >= observed_from)
+        if observed_to:
+            conditions.append(observed <= observed_to)
+
+    for name in MATCH_FILTERS:
+        value = args.get(name)
+        if value:
+            if name not in table.c:
+                raise ValueError(f"this form has no {name} column")
+            conditions.append(table.c[name] == value)
+
+    synced = (args.get("synced") or "").lower()
+    if synced:
+        if synced not in ("true", "false", "1", "0"):
+            raise ValueError("synced must be true or false")
+        # Literal true/false so "synced = 0" can use the partial unsynced index
+        conditions.append(table.c.synced == (true() if synced in ("true", "1") else false()))
+
+    return conditions
+
+
+def iter_chunks(session, model, conditions, chunk_size=None):
+    """
+    Yield lists of plain row tuples (export_columns order) matching the
+    conditions: a column-projected Core select, no ORM objects are built.
+    """
+    if chunk_size is None:
+        chunk_size = EXPORT_CHUNK_SIZE
+    query = select(*export_columns(model)).where(*conditions).order_by(model.__table__.c.id)
+    result = session.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def csv_stream(session, model, conditions, chunk_size=None):
+    """Yield the CSV text of an export, one encoded chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in export_columns(model)])
+    for rows in iter_chunks(session, model, conditions, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arrow_schema(model):
+    import pyarrow as pa  # only needed for Parquet / Arrow exports
+
+    fields = []
+    for column in export_columns(model):
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+def columnar_to_tempfile(session, model, conditions, fmt, chunk_size=None):
+    """
+    Write a Parquet or Arrow IPC file of the matching rows, one record batch
+    per chunk, and return its path (caller deletes).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(model)
+    fd, path = tempfile.mkstemp(prefix="datacollect-export-", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(path, schema)
+        else:
+            writer = pa.ipc.new_file(path, schema)
+        try:
+            for rows in iter_chunks(session, model, conditions, chunk_size):
+                arrays = []
+                for values, field in zip(zip(*rows), schema):
+                    if pa.types.is_timestamp(field.type):
+                        # Aware datetimes (from Kampala_time) are kept as local wall time
+                        values = [v.replace(tzinfo=None) if v is not None and v.tzinfo else v for v in values]
+                    arrays.append(pa.array(values, type=field.type))
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+        finally:
+            writer.close()
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
@@ -0,0 +1,357 @@
+"""
+Bulk ingestion into the record tables.
+
+- Field-book files (CSV / XLSX): rows are validated up front; a file with any
+  bad row is rejected as a whole with row-level errors, so fixing and
+  re-uploading it never duplicates data.
+- Offline replay: submissions queued by the service worker arrive as one JSON
+  batch with client idempotency keys; keys already stored are skipped.
+
+Both insert with chunked executemany INSERTs, queue the rows for Sheets sync
+and count them in form_stats in the same transaction.
+"""
+import csv
+import io
+from functools import lru_cache
+from datetime import date, datetime
+from urllib.parse import urlparse
+from sqlalchemy import select, insert, Integer, Float, Date, DateTime, Boolean, String, Text
+from db import db
+from models import (AgronomicRecord,
+                    DiseaseRecord,
+                    FieldConditionRecord,
+                    GreenhouseConditionRecord,
+                    GrowthFieldRecord,
+                    GrowthGreenhouseRecord,
+                    YieldFieldRecord,
+                    YieldGreenhouseRecord,
+                    SyncOutbox,
+                    ReplayKey,
+                    Kampala_time)
+from stats import LABEL_BY_MODEL, adjust_form_stats
+from config import IMPORT_CHUNK_SIZE
+
+# URL key -> model, matching the /form/<key> routes
+FORM_KEYS = {
+    "agronomic": AgronomicRecord,
+    "disease": DiseaseRecord,
+    "field": FieldConditionRecord,
+    "greenhouse": GreenhouseConditionRecord,
+    "growth_field": GrowthFieldRecord,
+    "growth_greenhouse": GrowthGreenhouseRecord,
+    "yield_field": YieldFieldRecord,
+    "yield_greenhouse": YieldGreenhouseRecord,
+}
+
+# Set by the app, never taken from a file
+NOT_IMPORTED = {"id", "created_at", "synced"}
+
+MAX_REPORTED_ERRORS = 100
+
+_MISSING = object()
+
+REPLAY_KEY_LENGTH = 64  # ReplayKey.key column size
+
+
+class UploadError(Exception):
+    """The upload could not be read at all (bad type, no header, ...)."""
+
+
+def import_columns(model):
+    """Columns a file may provide for a model, in table order."""
+    return [c for c in model.__table__.columns if c.key not in NOT_IMPORTED]
+
+
+def normalize_header(name):
+    return str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+# --- Coercion plans ---
+# Converters receive a non-blank value: a stripped string from a form, CSV
+# or JSON body, or a native value from an Excel cell.
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError(f"expected a whole number, got {value!r}")
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, float):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                value = float(value)  # "12.0" from number inputs and spreadsheets
+            except ValueError:
+                raise ValueError(f"expected a whole number, got {value!r}") from None
+    if not value.is_integer():
+        raise ValueError(f"expected a whole number, got {value}")
+    return int(value)
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text in ("1", "true", "yes", "y", "on"):
+        return True
+    if text in ("0", "false", "no", "n", "off"):
+        return False
+    raise ValueError(f"expected yes/no, got {value!r}")
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))  # YYYY-MM-DD, much cheaper than strptime
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _to_text(length):
+    def convert(value):
+        value = str(value)
+        if length and len(value) > length:
+            raise ValueError(f"longer than {length} characters")
+        return value
+    return convert
+
+
+def _converter(column):
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return _to_bool
+    if isinstance(column_type, Integer):
+        return _to_int
+    if isinstance(column_type, Float):
+        return float
+    if isinstance(column_type, DateTime):
+        return _to_datetime
+    if isinstance(column_type, Date):
+        return _to_date
+    if isinstance(column_type, (String, Text)):
+        return _to_text(getattr(column_type, "length", None))
+    return lambda value: value
+
+
+@lru_cache(maxsize=None)
+def coercion_plan(model):
+    """
+    (column key, converter) pairs for a model's importable columns, built
+    once per model from the column types and shared by every ingest path.
+    """
+    return tuple((column.key, _converter(column)) for column in import_columns(model))
+
+
+def _coerce(convert, value):
+    """Apply a converter; None and blank strings become None."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    return convert(value)
+
+
+def coerce_mapping(model, data):
+    """
+    Coerce a submitted form or JSON object (field name -> value) in one pass
+    over the model's plan; missing and unknown fields are skipped.
+    Returns (record, errors).
+    """
+    record, errors = {}, []
+    get = data.get
+    for key, convert in coercion_plan(model):
+        value = get(key, _MISSING)
+        if value is _MISSING:
+            continue
+        # _coerce inlined: this loop runs for every field of every submission
+        if value.__class__ is str:
+            value = value.strip()
+            if not value:
+                record[key] = None
+                continue
+        elif value is None:
+            record[key] = None
+            continue
+        try:
+            record[key] = convert(value)
+        except (TypeError, ValueError) as e:
+            errors.append(f"{key}: {e}")
+    return record, errors
+
+
+def form_values(model, data):
+    """Coerced column values for an HTML form post; raises ValueError on bad fields."""
+    record, errors = coerce_mapping(model, data)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return record
+
+
+def read_upload(filename, stream):
+    """
+    Read an uploaded CSV or XLSX file.
+    Returns (headers, rows) with normalized header names and each row as a
+    list of raw cell values.
+    """
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text)
+        header = next(reader, None)
+        rows = list(reader)
+    elif name.endswith(".xlsx"):
+        from openpyxl import load_workbook  # only needed for Excel uploads
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            values = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(values, None)
+            rows = [list(row) for row in values]
+        finally:
+            workbook.close()
+    else:
+        raise UploadError("Upload a .csv or .xlsx file")
+
+    if not header or not any(header):
+        raise UploadError("The file has no header row")
+    return [normalize_header(h) for h in header], rows
+
+
+def validate_rows(model, headers, rows):
+    """
+    Coerce every row against the model's columns.
+    Returns (records, errors, ignored_headers): records are dicts ready for
+    insert(); errors are (line number, message) pairs with the line number
+    as shown in a spreadsheet (header is line 1).
+    """
+    converters = dict(coercion_plan(model))
+    positions = [(i, h, converters[h]) for i, h in enumerate(headers) if h in converters]
+    ignored = [h for h in headers if h and h not in converters]
+    if not positions:
+        raise UploadError(
+            "None of the columns match this form. Expected some of: " + ", ".join(converters)
+        )
+
+    records, errors = [], []
+    for line, row in enumerate(rows, start=2):
+        if not any(cell not in (None, "") for cell in row):
+            continue  # blank line
+        record, row_errors = {}, []
+        width = len(row)
+        for i, key, convert in positions:
+            try:
+                record[key] = _coerce(convert, row[i] if i < width else None)
+            except (TypeError, ValueError) as e:
+                row_errors.append(f"{key}: {e}")
+        if row_errors:
+            errors.append((line, "; ".join(row_errors)))
+        else:
+            records.append(record)
+    return records, errors, ignored
+
+
+def insert_records(model, records, chunk_size=None):
+    """
+    Insert validated rows with chunked executemany INSERTs and queue them for
+    Sheets sync (caller commits). Returns the new record ids in input order.
+    """
+    if not records:
+        return []
+    if chunk_size is None:
+        chunk_size = IMPORT_CHUNK_SIZE
+
+    sheet_name = LABEL_BY_MODEL[model]
+    now = Kampala_time()
+    queued_at = now.replace(tzinfo=None)
+    new_ids = []
+    for start in range(0, len(records), chunk_size):
+        chunk = [
+            dict(record, created_at=now, synced=False)
+            for record in records[start:start + chunk_size]
+        ]
+        ids = db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), chunk).all()
+        new_ids.extend(ids)
+        db.session.execute(insert(SyncOutbox), [
+            {"sheet_name": sheet_name, "record_id": record_id, "attempts": 0, "next_attempt_at": queued_at}
+            for record_id in ids
+        ])
+
+    # Bulk INSERTs bypass the mapper events that maintain form_stats
+    adjust_form_stats(db.session.connection(), model,
+                      total=len(records), unsynced_delta=len(records), created_at=now)
+    return new_ids
+
+
+def form_key_from_url(url):
+    """
+    '/form/agronomic' or 'https://host/form/agronomic' -> 'agronomic'.
+    None unless the path is exactly a /form/<key> entry route.
+    """
+    if not isinstance(url, str):
+        return None
+    prefix, _, key = urlparse(url).path.rstrip("/").rpartition("/")
+    return key if prefix == "/form" and key in FORM_KEYS else None
+
+
+def replay_submissions(submissions):
+    """
+    Store a batch of offline-queued submissions (caller commits).
+    Each item is {"key": idempotency key, "url" or "form": target form,
+    "data": {field: value}}. Keys stored by an earlier replay, or repeated in
+    this batch, are skipped. Invalid items are rejected without affecting the
+    rest. Returns {"accepted": [keys], "duplicates": [keys],
+    "rejected": [{"key", "error"}]}.
+    """
+    result = {"accepted": [], "duplicates": [], "rejected": []}
+
+    keys = [item.get("key") for item in submissions if isinstance(item, dict)]
+    keys = [key for key in keys if isinstance(key, str)]
+    seen = set(db.session.scalars(select(ReplayKey.key).where(ReplayKey.key.in_(keys)))) if keys else set()
+
+    pending = {}  # model -> [(key, record)]
+    for item in submissions:
+        key = item.get("key") if isinstance(item, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= REPLAY_KEY_LENGTH:
+            result["rejected"].append({"key": key, "error": "missing or invalid idempotency key"})
+            continue
+        if key in seen:
+            result["duplicates"].append(key)
+            continue
+
+        form = item.get("form")
+        form_key = form if isinstance(form, str) else None
+        model = FORM_KEYS.get(form_key or form_key_from_url(item.get("url")))
+        data = item.get("data")
+        if model is None:
+            result["rejected"].append({"key": key, "error": "unknown form"})
+            continue
+        if not isinstance(data, dict):
+            result["rejected"].append({"key": key, "error": "data must be an object"})
+            continue
+
+        record, errors = coerce_mapping(model, data)
+        if errors:
+            result["rejected"].append({"key": key, "error": "; ".join(errors)})
+            continue
+        if all(value is None for value in record.values()):
+            result["rejected"].append({"key": key, "error": "no recognised fields"})
+            continue
+        seen.add(key)
+        pending.setdefault(model, []).append((key, record))
+
+    for model, items in pending.items():
+        ids = insert_records(model, [record for _, record in items])
+        db.session.execute(insert(ReplayKey), [
+            {"key": key, "form": LABEL_BY_MODEL[model], "record_id": record_id}
+            for (key, _), record_id in zip(items, ids)
+        ])
+        result["accepted"].extend(key for key, _ in items)
+
+    return result
@@ -0,0 +1,26 @@
+"""baseline: schema created by create_tables()
+
+Revision ID: 5b2e0c1d7a90
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e0c1d7a90'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables are created on startup by models.create_tables(); later
+    # revisions only add to that schema.
+    pass
+
+
+def downgrade():
+    pass
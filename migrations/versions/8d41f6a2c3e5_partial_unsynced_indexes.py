@@ -0,0 +1,49 @@
+"""partial indexes on unsynced rows
+
+Revision ID: 8d41f6a2c3e5
+Revises: 5b2e0c1d7a90
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f6a2c3e5'
+down_revision = '5b2e0c1d7a90'
+branch_labels = None
+depends_on = None
+
+RECORD_TABLES = [
+    'agronomic_record',
+    'disease_record',
+    'field_condition_record',
+    'greenhouse_condition_record',
+    'growth_field_record',
+    'growth_greenhouse_record',
+    'yield_field_record',
+    'yield_greenhouse_record',
+]
+
+
+def _existing_indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table in RECORD_TABLES:
+        name = f'ix_{table}_unsynced'
+        # create_tables() may already have built it on a fresh database
+        if name in _existing_indexes(table):
+            continue
+        # Same literal the app queries with: "synced = 0" on SQLite, "synced = false" on Postgres
+        where = sa.column('synced') == sa.false()
+        op.create_index(name, table, ['id'], sqlite_where=where, postgresql_where=where)
+
+
+def downgrade():
+    for table in RECORD_TABLES:
+        name = f'ix_{table}_unsynced'
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
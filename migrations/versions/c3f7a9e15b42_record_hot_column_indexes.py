@@ -0,0 +1,57 @@
+"""created_at, synced and crop/genotype/replication indexes on record tables
+
+Revision ID: c3f7a9e15b42
+Revises: 8d41f6a2c3e5
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a9e15b42'
+down_revision = '8d41f6a2c3e5'
+branch_labels = None
+depends_on = None
+
+RECORD_TABLES = [
+    'agronomic_record',
+    'disease_record',
+    'field_condition_record',
+    'greenhouse_condition_record',
+    'growth_field_record',
+    'growth_greenhouse_record',
+    'yield_field_record',
+    'yield_greenhouse_record',
+]
+
+# index name suffix -> columns
+INDEXES = {
+    'created_at': ['created_at'],
+    'synced': ['synced'],
+    'crop_genotype_rep': ['crop', 'genotype', 'replication'],
+}
+
+
+def _existing_indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table in RECORD_TABLES:
+        existing = _existing_indexes(table)
+        for suffix, columns in INDEXES.items():
+            name = f'ix_{table}_{suffix}'
+            # create_tables() may already have built it on a fresh database
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table in RECORD_TABLES:
+        existing = _existing_indexes(table)
+        for suffix in INDEXES:
+            name = f'ix_{table}_{suffix}'
+            if name in existing:
+                op.drop_index(name, table_name=table)
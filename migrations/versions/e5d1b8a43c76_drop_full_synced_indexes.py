@@ -0,0 +1,45 @@
+"""drop full synced indexes (ix_*_unsynced serves pending-row lookups)
+
+Revision ID: e5d1b8a43c76
+Revises: c3f7a9e15b42
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d1b8a43c76'
+down_revision = 'c3f7a9e15b42'
+branch_labels = None
+depends_on = None
+
+RECORD_TABLES = [
+    'agronomic_record',
+    'disease_record',
+    'field_condition_record',
+    'greenhouse_condition_record',
+    'growth_field_record',
+    'growth_greenhouse_record',
+    'yield_field_record',
+    'yield_greenhouse_record',
+]
+
+
+def _existing_indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table in RECORD_TABLES:
+        name = f'ix_{table}_synced'
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for table in RECORD_TABLES:
+        name = f'ix_{table}_synced'
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, ['synced'])
@@ -1,4 +1,5 @@
 from db import db
+from sqlalchemy import false
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -170,6 +171,104 @@ class YieldGreenhouseRecord(db.Model):
     synced = db.Column(db.Boolean, default=False, nullable=False)
 
 
+# Every record model paired with its worksheet / form label
+FORM_MODELS = [
+    (AgronomicRecord, "Agronomic"),
+    (DiseaseRecord, "Disease"),
+    (FieldConditionRecord, "Field Condition"),
+    (GreenhouseConditionRecord, "Greenhouse Condition"),
+    (GrowthFieldRecord, "Growth (Field)"),
+    (GrowthGreenhouseRecord, "Growth (Greenhouse)"),
+    (YieldFieldRecord, "Yield (Field)"),
+    (YieldGreenhouseRecord, "Yield (Greenhouse)"),
+]
+
+
+# Partial indexes holding only the rows still waiting for Google Sheets sync,
+# so finding pending rows costs O(pending) instead of a full table scan
+for _model, _ in FORM_MODELS:
+    _table = _model.__table__
+    db.Index(
+        f"ix_{_table.name}_unsynced",
+        _table.c.id,
+        sqlite_where=_table.c.synced == false(),
+        postgresql_where=_table.c.synced == false(),
+    )
+    # Recent-entry ordering and trial-layout lookups. No full index on synced:
+    # the planner prefers it to ix_*_unsynced once ANALYZE has run, and it
+    # costs a write on every insert
+    db.Index(f"ix_{_table.name}_created_at", _table.c.created_at)
+    db.Index(f"ix_{_table.name}_crop_genotype_rep", _table.c.crop, _table.c.genotype, _table.c.replication)
+
+
+def unsynced(model):
+    """
+    Filter for rows not yet synced. Compares against a literal false (not a
+    bound parameter) so the database can match it to the partial index.
+    """
+    return model.synced == false()
+
+
+# --- Sync outbox ---
+class SyncOutbox(db.Model):
+    """Records waiting for the background worker to push them to Google Sheets."""
+    id = db.Column(db.Integer, primary_key=True)
+    sheet_name = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    claimed_by = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=Kampala_time)
+
+
+# --- Sync checkpoint ---
+class SyncCheckpoint(db.Model):
+    """Progress of a streamed sync_all run for one worksheet, for crash recovery."""
+    sheet_name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer)        # highest record id pushed and committed
+    inflight_from = db.Column(db.Integer)  # chunk being pushed when the run stopped
+    inflight_to = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=Kampala_time, onupdate=Kampala_time)
+
+
+# --- Offline replay keys ---
+class ReplayKey(db.Model):
+    """Idempotency keys of replayed offline submissions, so retries never duplicate."""
+    key = db.Column(db.String(64), primary_key=True)
+    form = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=Kampala_time)
+
+
+# --- Export jobs ---
+class ExportJob(db.Model):
+    """A background all-forms Excel export, polled by the browser until done."""
+    id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), default="queued", nullable=False)  # queued, running, done, failed
+    progress = db.Column(db.Text)  # JSON {sheet: {"rows": n, "total": n}}
+    error = db.Column(db.Text)
+    path = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=Kampala_time)
+    finished_at = db.Column(db.DateTime)
+
+
+# --- Per-form statistics ---
+class FormStats(db.Model):
+    """Running totals per form, kept current by the mapper events in stats.py."""
+    __tablename__ = "form_stats"
+    form = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+    unsynced = db.Column(db.Integer, default=0, nullable=False)
+    last_created_at = db.Column(db.DateTime)
+
+
 def create_tables():
-    """Create all tables if they don’t exist."""
+    """Create all tables and their indexes if they don’t exist."""
     db.create_all()
+    # create_all skips indexes on tables that already exist (older databases)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+import requests
+from config import SHEETS_READS_PER_MINUTE, SHEETS_WRITES_PER_MINUTE, SHEETS_MAX_RETRIES
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 64
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket sized so that no rolling 60s window can exceed
+    per_minute calls: a small burst plus a refill of the remaining budget.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.capacity = burst or max(1, per_minute // 6)
+        self.rate = max(per_minute - self.capacity, 1) / 60.0  # tokens per second
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+read_bucket = TokenBucket(SHEETS_READS_PER_MINUTE)
+write_bucket = TokenBucket(SHEETS_WRITES_PER_MINUTE)
+enabled = True
+
+
+def set_enabled(flag):
+    """Turn quota throttling on/off (off for backends without an API quota)."""
+    global enabled
+    enabled = bool(flag)
+
+
+def _status_code(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(exc):
+    """Quota (429), server (5xx) and network errors are worth retrying."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _retry_delay(exc, attempt):
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        # Callers sleep holding the worksheet lock: never stall a sheet for long
+        return min(int(retry_after), MAX_BACKOFF_SECONDS)
+    # Exponential backoff with jitter, as recommended for the Sheets API
+    return min(2 ** attempt + random.uniform(0, 1), MAX_BACKOFF_SECONDS)
+
+
+def _call(bucket, fn, args, kwargs):
+    attempt = 0
+    while True:
+        if enabled:
+            bucket.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= SHEETS_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"Sheets API error ({_status_code(e) or type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def sheets_read(fn, *args, **kwargs):
+    """Call a gspread read method under the read quota, retrying 429/5xx."""
+    return _call(read_bucket, fn, args, kwargs)
+
+
+def sheets_write(fn, *args, **kwargs):
+    """Call a gspread write method under the write quota, retrying 429/5xx."""
+    return _call(write_bucket, fn, args, kwargs)
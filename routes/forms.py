@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from models import (AgronomicRecord, 
                     DiseaseRecord, 
                     FieldConditionRecord, 
@@ -6,15 +6,24 @@ from models import (AgronomicRecord,
                    GrowthFieldRecord, 
                    GrowthGreenhouseRecord, 
                    YieldFieldRecord, 
-                   YieldGreenhouseRecord)
-from db import db
-from sheets_utils import sync_to_sheets
-
-from datetime import datetime
-
-import pandas as pd
-from flask import send_file
-from io import BytesIO
+                   YieldGreenhouseRecord,
+                   FORM_MODELS)
+from db import db, read_session
+from sheets_utils import sync_pending
+from sync_worker import enqueue, worker
+from ingest import (FORM_KEYS, MAX_REPORTED_ERRORS, UploadError, import_columns, read_upload,
+                    validate_rows, insert_records, replay_submissions, form_values)
+from sqlalchemy.exc import IntegrityError
+from stats import LABEL_BY_MODEL
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import os
+from flask import Response, send_file, stream_with_context
+from exports import (XLSX_MIMETYPE, COLUMNAR_FORMATS, stream_and_delete,
+                     export_filters, csv_stream, columnar_to_tempfile)
+from export_cache import cached_workbook
+from export_jobs import create_job, get_job, job_status
 
 bp = Blueprint("forms", __name__, url_prefix="/form")
 
@@ -29,17 +38,12 @@ SHEET_MAP = {
     "YieldGreenhouseRecord": "Yield (Greenhouse)",
 }
 
-def save_and_sync(record):
-    """Save record locally, try to sync to Google Sheets, and update status."""
+def save_and_queue(record):
+    """Save record locally and queue it for background sync to Google Sheets."""
     db.session.add(record)
-    db.session.commit() 
-
-    sheet_name = SHEET_MAP[record.__class__.__name__]
-    if sync_to_sheets(record, sheet_name):
-        record.synced = True
-        db.session.commit()
-        return True
-    return False
+    enqueue(record, SHEET_MAP[record.__class__.__name__])
+    db.session.commit()
+    worker.wake()
 
 def generate_dropdown_list(prefix: str, count: int):
     """Generate dropdown options like 'Genotype 1'...'Genotype 90'."""
@@ -56,47 +60,21 @@ def agronomic():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = AgronomicRecord(
-                crop=request.form.get("crop"),
-                block=request.form.get("block"),
-                replication=request.form.get("replication"),
-                plot_number=request.form.get("plot_number"),
-                genotype=request.form.get("genotype"),
-                days_heading=int(request.form.get("days_heading")) if request.form.get("days_heading") else None,
-                days_maturity=int(request.form.get("days_maturity")) if request.form.get("days_maturity") else None,
-                plant_height=float(request.form.get("plant_height")) if request.form.get("plant_height") else None,
-                tillers=int(request.form.get("tillers")) if request.form.get("tillers") else None,
-                panicle_length=float(request.form.get("panicle_length")) if request.form.get("panicle_length") else None,
-                grain_yield=float(request.form.get("grain_yield")) if request.form.get("grain_yield") else None,
-                grain_weight=float(request.form.get("grain_weight")) if request.form.get("grain_weight") else None,
-                spikelets_total=int(request.form.get("spikelets_total")) if request.form.get("spikelets_total") else None,
-                spikelets_filled=int(request.form.get("spikelets_filled")) if request.form.get("spikelets_filled") else None,
-                fertility=float(request.form.get("fertility")) if request.form.get("fertility") else None,
-                observation_date=datetime.strptime(request.form.get("observation_date"), "%Y-%m-%d").date()
-                    if request.form.get("observation_date") else None,
-                observer=request.form.get("observer"),
-                remarks=request.form.get("remarks"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = AgronomicRecord(**form_values(AgronomicRecord, request.form))
 
-            # Step 4: Sync with Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
+            flash("Data saved (syncing in background)", "success")
 
         except Exception as e:
-            # Step 5: Handle errors
+            # Step 4: Handle errors
             db.session.rollback()
             flash(f"Error saving data: {e}", "danger")
 
-        # Step 6: Redirect
+        # Step 5: Redirect
         return redirect(url_for("main.dashboard"))
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/agronomic.html",
         crops=crops,
@@ -117,48 +95,21 @@ def disease():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = DiseaseRecord(
-                crop=request.form.get("crop"),
-                block=request.form.get("block"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                plot_number=request.form.get("plot_number"),
-                panicles_t1=int(request.form.get("panicles_t1")) if request.form.get("panicles_t1") else None,
-                infected_t1=int(request.form.get("infected_t1")) if request.form.get("infected_t1") else None,
-                incidence_t1=float(request.form.get("incidence_t1")) if request.form.get("incidence_t1") else None,
-                panicles_t2=int(request.form.get("panicles_t2")) if request.form.get("panicles_t2") else None,
-                infected_t2=int(request.form.get("infected_t2")) if request.form.get("infected_t2") else None,
-                incidence_t2=float(request.form.get("incidence_t2")) if request.form.get("incidence_t2") else None,
-                panicles_t3=int(request.form.get("panicles_t3")) if request.form.get("panicles_t3") else None,
-                infected_t3=int(request.form.get("infected_t3")) if request.form.get("infected_t3") else None,
-                incidence_t3=float(request.form.get("incidence_t3")) if request.form.get("incidence_t3") else None,
-                severity_t1=int(request.form.get("severity_t1")) if request.form.get("severity_t1") else None,
-                severity_t2=int(request.form.get("severity_t2")) if request.form.get("severity_t2") else None,
-                severity_t3=int(request.form.get("severity_t3")) if request.form.get("severity_t3") else None,
-                days_first_symptom=int(request.form.get("days_first_symptom")) if request.form.get("days_first_symptom") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = DiseaseRecord(**form_values(DiseaseRecord, request.form))
 
-            # Step 4: Sync with Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirmation and redirect
+            # Step 4: Confirmation and redirect
             flash("Disease data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving disease record: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/disease.html",
         crops=crops,
@@ -178,44 +129,21 @@ def field_condition():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = FieldConditionRecord(
-                crop=request.form.get("crop"),
-                block=request.form.get("block"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                date=datetime.strptime(request.form.get("date"), "%Y-%m-%d").date()
-                     if request.form.get("date") else None,
-                location=request.form.get("location"),
-                soil_type=request.form.get("soil_type"),
-                fertility_status=request.form.get("fertility_status"),
-                temp_min=float(request.form.get("temp_min")) if request.form.get("temp_min") else None,
-                temp_max=float(request.form.get("temp_max")) if request.form.get("temp_max") else None,
-                temp_avg=float(request.form.get("temp_avg")) if request.form.get("temp_avg") else None,
-                humidity=float(request.form.get("humidity")) if request.form.get("humidity") else None,
-                rainfall=float(request.form.get("rainfall")) if request.form.get("rainfall") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = FieldConditionRecord(**form_values(FieldConditionRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Field condition data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving field condition: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/field_condition.html",
         crops=crops,
@@ -235,44 +163,21 @@ def greenhouse_condition():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = GreenhouseConditionRecord(
-                crop=request.form.get("crop"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                date=datetime.strptime(request.form.get("date"), "%Y-%m-%d").date()
-                     if request.form.get("date") else None,
-                location=request.form.get("location"),
-                temp_min=float(request.form.get("temp_min")) if request.form.get("temp_min") else None,
-                temp_max=float(request.form.get("temp_max")) if request.form.get("temp_max") else None,
-                temp_avg=float(request.form.get("temp_avg")) if request.form.get("temp_avg") else None,
-                humidity=float(request.form.get("humidity")) if request.form.get("humidity") else None,
-                light_intensity=request.form.get("light_intensity"),
-                inoculum=request.form.get("inoculum"),
-                spray_timing=request.form.get("spray_timing"),
-                spray_frequency=int(request.form.get("spray_frequency")) if request.form.get("spray_frequency") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = GreenhouseConditionRecord(**form_values(GreenhouseConditionRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Greenhouse condition data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving greenhouse condition: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/greenhouse_condition.html",
         crops=crops,
@@ -292,39 +197,21 @@ def growth_field():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = GrowthFieldRecord(
-                crop=request.form.get("crop"),
-                block=request.form.get("block"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                plot_number=request.form.get("plot_number"),
-                days_flowering=int(request.form.get("days_flowering")) if request.form.get("days_flowering") else None,
-                days_maturity=int(request.form.get("days_maturity")) if request.form.get("days_maturity") else None,
-                plant_height=float(request.form.get("plant_height")) if request.form.get("plant_height") else None,
-                tillers=int(request.form.get("tillers")) if request.form.get("tillers") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = GrowthFieldRecord(**form_values(GrowthFieldRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Growth (Field) data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving Growth (Field) record: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/growth_field.html",
         crops=crops,
@@ -344,38 +231,21 @@ def growth_greenhouse():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = GrowthGreenhouseRecord(
-                crop=request.form.get("crop"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                greenhouse_id=request.form.get("greenhouse_id"),
-                days_flowering=int(request.form.get("days_flowering")) if request.form.get("days_flowering") else None,
-                days_maturity=int(request.form.get("days_maturity")) if request.form.get("days_maturity") else None,
-                plant_height=float(request.form.get("plant_height")) if request.form.get("plant_height") else None,
-                tillers=int(request.form.get("tillers")) if request.form.get("tillers") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = GrowthGreenhouseRecord(**form_values(GrowthGreenhouseRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Growth (Greenhouse) data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving Growth (Greenhouse) record: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/growth_greenhouse.html",
         crops=crops,
@@ -395,42 +265,21 @@ def yield_field():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = YieldFieldRecord(
-                crop=request.form.get("crop"),
-                block=request.form.get("block"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                plot_number=request.form.get("plot_number"),
-                panicles=int(request.form.get("panicles")) if request.form.get("panicles") else None,
-                panicle_length=float(request.form.get("panicle_length")) if request.form.get("panicle_length") else None,
-                filled_grains=int(request.form.get("filled_grains")) if request.form.get("filled_grains") else None,
-                unfilled_grains=int(request.form.get("unfilled_grains")) if request.form.get("unfilled_grains") else None,
-                grain_weight=float(request.form.get("grain_weight")) if request.form.get("grain_weight") else None,
-                yield_plant=float(request.form.get("yield_plant")) if request.form.get("yield_plant") else None,
-                yield_plot=float(request.form.get("yield_plot")) if request.form.get("yield_plot") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = YieldFieldRecord(**form_values(YieldFieldRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Yield (Field) data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving Yield (Field) record: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/yield_field.html",
         crops=crops,
@@ -450,41 +299,21 @@ def yield_greenhouse():
     if request.method == "POST":
         try:
             # Step 2: Create record from form data
-            record = YieldGreenhouseRecord(
-                crop=request.form.get("crop"),
-                genotype=request.form.get("genotype"),
-                replication=request.form.get("replication"),
-                greenhouse_id=request.form.get("greenhouse_id"),
-                panicles=int(request.form.get("panicles")) if request.form.get("panicles") else None,
-                panicle_length=float(request.form.get("panicle_length")) if request.form.get("panicle_length") else None,
-                filled_grains=int(request.form.get("filled_grains")) if request.form.get("filled_grains") else None,
-                unfilled_grains=int(request.form.get("unfilled_grains")) if request.form.get("unfilled_grains") else None,
-                grain_weight=float(request.form.get("grain_weight")) if request.form.get("grain_weight") else None,
-                yield_plant=float(request.form.get("yield_plant")) if request.form.get("yield_plant") else None,
-                yield_tray=float(request.form.get("yield_tray")) if request.form.get("yield_tray") else None,
-                notes=request.form.get("notes"),
-            )
-
-            # Step 3: Save to database
-            db.session.add(record)
-            db.session.commit()
+            record = YieldGreenhouseRecord(**form_values(YieldGreenhouseRecord, request.form))
 
-            # Step 4: Sync to Google Sheets
-            if save_and_sync(record):
-                flash("Data saved & synced!", "success")
-            else:
-                flash("Data saved (pending sync)", "warning")
+            # Step 3: Save locally and queue for Google Sheets sync
+            save_and_queue(record)
 
-            # Step 5: Confirm and redirect
+            # Step 4: Confirm and redirect
             flash("Yield (Greenhouse) data saved!", "success")
             return redirect(url_for("main.dashboard"))
 
         except Exception as e:
-            # Step 6: Handle errors
+            # Step 5: Handle errors
             db.session.rollback()
             flash(f"Error saving Yield (Greenhouse) record: {e}", "danger")
 
-    # Step 7: Render template with dropdown data
+    # Step 6: Render template with dropdown data
     return render_template(
         "forms/yield_greenhouse.html",
         crops=crops,
@@ -492,47 +321,119 @@ def yield_greenhouse():
         replications=replications
     )
 
+def _sync_in_context(app, model, sheet):
+    """Sync one worksheet in its own app context, so it gets its own DB session."""
+    with app.app_context():
+        try:
+            return sync_pending(model, sheet)
+        finally:
+            db.session.remove()
+
+
+@bp.route("/import/<form_key>", methods=["GET", "POST"])
+def import_records(form_key):
+    """Bulk-load a CSV/XLSX field book into one form's table."""
+    model = FORM_KEYS.get(form_key)
+    if model is None:
+        return "Unknown form", 404
+
+    context = {
+        "form_key": form_key,
+        "form_label": LABEL_BY_MODEL[model],
+        "form_keys": {key: LABEL_BY_MODEL[m] for key, m in FORM_KEYS.items()},
+        "columns": [c.key for c in import_columns(model)],
+        "errors": [],
+        "error_count": 0,
+        "ignored": [],
+    }
+
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if upload is None or not upload.filename:
+            flash("Choose a CSV or Excel file to import", "warning")
+            return render_template("forms/import.html", **context)
+
+        try:
+            # Step 1: Read and validate every row before touching the database
+            headers, rows = read_upload(upload.filename, upload.stream)
+            records, errors, ignored = validate_rows(model, headers, rows)
+            context["ignored"] = ignored
+
+            if errors:
+                context["errors"] = errors[:MAX_REPORTED_ERRORS]
+                context["error_count"] = len(errors)
+                flash(f"Nothing imported: {len(errors)} row(s) need fixing", "danger")
+                return render_template("forms/import.html", **context)
+
+            # Step 2: Insert in chunks, queue for Sheets sync, commit once
+            count = len(insert_records(model, records))
+            db.session.commit()
+            worker.wake()
+            flash(f"Imported {count} {context['form_label']} records (syncing in background)", "success")
+            if ignored:
+                flash(f"Ignored columns: {', '.join(ignored)}", "info")
+            # Redirect so a browser refresh cannot re-post the file
+            return redirect(url_for("forms.import_records", form_key=form_key))
+
+        except UploadError as e:
+            flash(str(e), "danger")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error importing data: {e}", "danger")
+
+    return render_template("forms/import.html", **context)
+
+
+@bp.route("/replay", methods=["POST"])
+def replay():
+    """
+    Store the service worker's offline queue in one request. Safe to retry:
+    submissions whose idempotency key was already stored are skipped.
+    """
+    payload = request.get_json(silent=True)
+    submissions = payload.get("submissions") if isinstance(payload, dict) else payload
+    if not isinstance(submissions, list):
+        return jsonify({"error": "Expected a JSON array of submissions"}), 400
+
+    try:
+        result = replay_submissions(submissions)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent replay stored one of these keys first; retrying sorts it out
+        db.session.rollback()
+        return jsonify({"error": "Replay conflict, retry"}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in replay: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    if result["accepted"]:
+        worker.wake()
+    print(f"Replay: {len(result['accepted'])} stored, {len(result['duplicates'])} duplicates, "
+          f"{len(result['rejected'])} rejected")
+    return jsonify(result)
+
+
 @bp.route("/sync_all", methods=["POST"])
 def sync_all():
     try:
-        models = [
-            (AgronomicRecord, "Agronomic"),
-            (DiseaseRecord, "Disease"),
-            (FieldConditionRecord, "Field Condition"),
-            (GreenhouseConditionRecord, "Greenhouse Condition"),
-            (GrowthFieldRecord, "Growth (Field)"),
-            (GrowthGreenhouseRecord, "Growth (Greenhouse)"),
-            (YieldFieldRecord, "Yield (Field)"),
-            (YieldGreenhouseRecord, "Yield (Greenhouse)"),
-        ]
-
         results = {}
         total_synced = 0
 
-        for model, sheet in models:
-            unsynced = db.session.query(model).filter_by(synced=False).all()
-            print(f"Checking {sheet} → found {len(unsynced)} unsynced rows")
-
-            synced_here = 0
-            for row in unsynced:
-                print(f"  → Attempting to sync {sheet} row id={row.id}")
-                result = sync_to_sheets(row, sheet)
-
-                if result in [True, "already"]:
-                    row.synced = True
-                    synced_here += 1
-                    if result == "already":
-                        print(f"    Already in sheet, marking synced row id={row.id}")
-                    else:
-                        print(f"    Synced row id={row.id}")
-                else:
-                    print(f"    Failed to sync row id={row.id}")
-
-            if synced_here > 0:
-                db.session.commit()  # commit after each model batch
-                results[sheet] = synced_here
-                total_synced += synced_here
-                print(f"Finished {sheet}, synced {synced_here} rows")
+        # Each worksheet is independent: fan out on a bounded pool
+        app = current_app._get_current_object()
+        max_workers = max(1, min(app.config.get("SYNC_MAX_WORKERS", 4), len(FORM_MODELS)))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_sync_in_context, app, model, sheet): sheet
+                for model, sheet in FORM_MODELS
+            }
+            for future in as_completed(futures):
+                sheet = futures[future]
+                synced_here, _ = future.result()
+                if synced_here > 0:
+                    results[sheet] = synced_here
+                    total_synced += synced_here
 
         db.session.commit()  # final safeguard
         print(f"Total synced across all models: {total_synced}")
@@ -559,38 +460,97 @@ def sync_all():
 @bp.route("/download/all")
 def download_all():
     try:
-        output = BytesIO()
-
-        forms = [
-            (AgronomicRecord, "Agronomic"),
-            (DiseaseRecord, "Disease"),
-            (FieldConditionRecord, "Field Condition"),
-            (GreenhouseConditionRecord, "Greenhouse Condition"),
-            (GrowthFieldRecord, "Growth (Field)"),
-            (GrowthGreenhouseRecord, "Growth (Greenhouse)"),
-            (YieldFieldRecord, "Yield (Field)"),
-            (YieldGreenhouseRecord, "Yield (Greenhouse)"),
-        ]
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for model, sheet_name in forms:
-                records = model.query.all()
-                if records:
-                    df = pd.DataFrame([r.__dict__ for r in records])
-                    if "_sa_instance_state" in df.columns:
-                        df = df.drop(columns=["_sa_instance_state"])
-                else:
-                    df = pd.DataFrame(columns=["No Data"])
-                df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        output.seek(0)
+        # Heavy read: use the replica when DATABASE_READ_URL is set.
+        # Served from the export cache while no form changed; see export_cache.py
+        with read_session() as session:
+            path = cached_workbook(session)
 
         return send_file(
-            output,
+            path,
             as_attachment=True,
             download_name="DataCollect_All.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mimetype=XLSX_MIMETYPE,
+            max_age=0
         )
 
     except Exception as e:
         return f"Error exporting Excel: {e}", 500
+
+
+@bp.route("/export_jobs", methods=["POST"])
+def start_export_job():
+    """Start an all-forms Excel export in the background; poll the status URL."""
+    try:
+        job = create_job(current_app._get_current_object())
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        **job_status(job),
+        "status_url": url_for("forms.export_job", job_id=job.id),
+    }), 202
+
+
+@bp.route("/export_jobs/<job_id>")
+def export_job(job_id):
+    job = get_job(job_id, current_app.config["EXPORT_JOB_TTL_SECONDS"])
+    if job is None:
+        return jsonify({"error": "Unknown or expired export job"}), 404
+    status = job_status(job)
+    if job.status == "done":
+        status["download_url"] = url_for("forms.download_export_job", job_id=job.id)
+    return jsonify(status)
+
+
+@bp.route("/export_jobs/<job_id>/download")
+def download_export_job(job_id):
+    job = get_job(job_id, current_app.config["EXPORT_JOB_TTL_SECONDS"])
+    if job is None or (job.status == "done" and not os.path.exists(job.path or "")):
+        return "Unknown or expired export job", 404
+    if job.status != "done":
+        return f"Export job is {job.status}", 409
+    return send_file(
+        job.path,
+        as_attachment=True,
+        download_name="DataCollect_All.xlsx",
+        mimetype=XLSX_MIMETYPE
+    )
+
+
+@bp.route("/export/<form_key>.<fmt>")
+def export_form(form_key, fmt):
+    """
+    One form's records as CSV, Parquet or Arrow IPC, e.g.
+    /form/export/agronomic.parquet?crop=Crop%201&created_from=2024-01-01&synced=false
+    """
+    model = FORM_KEYS.get(form_key)
+    if model is None or fmt not in COLUMNAR_FORMATS:
+        return "Unknown form or format", 404
+    try:
+        conditions = export_filters(model, request.args)
+    except ValueError as e:
+        return f"Bad filter: {e}", 400
+
+    filename = f"DataCollect_{form_key}.{fmt}"
+    disposition = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if fmt == "csv":
+        def generate():
+            # Runs while the response streams: keep a session open until the last chunk
+            with read_session() as session:
+                yield from csv_stream(session, model, conditions)
+
+        return Response(stream_with_context(generate()), mimetype=COLUMNAR_FORMATS[fmt], headers=disposition)
+
+    try:
+        with read_session() as session:
+            path = columnar_to_tempfile(session, model, conditions, fmt)
+        return Response(
+            stream_and_delete(path),
+            mimetype=COLUMNAR_FORMATS[fmt],
+            headers={**disposition, "Content-Length": str(os.path.getsize(path))},
+        )
+    except ImportError:
+        return "Parquet/Arrow export needs pyarrow installed", 501
+    except Exception as e:
+        return f"Error exporting {fmt}: {e}", 500
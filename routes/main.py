@@ -1,13 +1,10 @@
-from flask import Blueprint, render_template
-from models import (AgronomicRecord, 
-                    DiseaseRecord, 
-                    FieldConditionRecord, 
-                    GreenhouseConditionRecord,
-                   GrowthFieldRecord, 
-                   GrowthGreenhouseRecord, 
-                   YieldFieldRecord, 
-                   YieldGreenhouseRecord)
-from app import db
+from flask import Blueprint, render_template, request, current_app, make_response, jsonify
+from models import SyncOutbox
+from sqlalchemy import func, case
+from db import db, read_session
+import dashboard_cache
+from stats import read_form_stats, recent_activity
+from sync_worker import worker
 
 bp = Blueprint("main", __name__, url_prefix="/")
 
@@ -23,77 +20,77 @@ def offline():
 
 @bp.route("/dashboard")
 def dashboard():
-    # --- Counts per table ---
-    agronomic_count = db.session.query(AgronomicRecord).count()
-    disease_count = db.session.query(DiseaseRecord).count()
-    field_count = db.session.query(FieldConditionRecord).count()
-    greenhouse_count = db.session.query(GreenhouseConditionRecord).count()
-    growth_field_count = db.session.query(GrowthFieldRecord).count()
-    growth_greenhouse_count = db.session.query(GrowthGreenhouseRecord).count()
-    yield_field_count = db.session.query(YieldFieldRecord).count()
-    yield_greenhouse_count = db.session.query(YieldGreenhouseRecord).count()
-
-    total_records = (
-        agronomic_count + disease_count + field_count +
-        greenhouse_count + growth_field_count +
-        growth_greenhouse_count + yield_field_count +
-        yield_greenhouse_count
-    )
+    max_age = current_app.config["DASHBOARD_CACHE_SECONDS"]
 
-    unsynced_counts = {
-        "Agronomic": db.session.query(AgronomicRecord).filter_by(synced=False).count(),
-        "Disease": db.session.query(DiseaseRecord).filter_by(synced=False).count(),
-        "Field Condition": db.session.query(FieldConditionRecord).filter_by(synced=False).count(),
-        "Greenhouse Condition": db.session.query(GreenhouseConditionRecord).filter_by(synced=False).count(),
-        "Growth (Field)": db.session.query(GrowthFieldRecord).filter_by(synced=False).count(),
-        "Growth (Greenhouse)": db.session.query(GrowthGreenhouseRecord).filter_by(synced=False).count(),
-        "Yield (Field)": db.session.query(YieldFieldRecord).filter_by(synced=False).count(),
-        "Yield (Greenhouse)": db.session.query(YieldGreenhouseRecord).filter_by(synced=False).count(),
-    }
+    # Unchanged since the client's copy: answer 304 without touching the database
+    if dashboard_cache.is_fresh(max_age):
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(dashboard_cache.etag())
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and since >= dashboard_cache.last_modified()
+        if not_modified:
+            return _with_validators(make_response("", 304))
+
+    context = dashboard_cache.get(max_age)
+    if context is None:
+        generation = dashboard_cache.generation()
+        context = dashboard_context()
+        dashboard_cache.put(generation, context)
+
+    # Live worker state (last_run changes on every idle poll) is merged in at
+    # render time: comparing it in put() would change the ETag with no new data
+    sync_queue = dict(worker.state(), **context["sync_queue"])
+    response = make_response(render_template("dashboard.html", **dict(context, sync_queue=sync_queue)))
+    return _with_validators(response).make_conditional(request)
+
+
+def _with_validators(response):
+    response.set_etag(dashboard_cache.etag())
+    response.last_modified = dashboard_cache.last_modified()
+    # Let browsers keep a copy but always revalidate it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def dashboard_context():
+    """Everything the dashboard template shows, computed from the database."""
+    # Primary, not the replica: this context is cached under the generation a
+    # local write just bumped, so a lagging replica would pin pre-write numbers.
+    # All three reads are small and index-backed.
+
+    # --- Counts, unsynced counts and latest entry per table (form_stats) ---
+    stats = read_form_stats()
+
+    agronomic_count = stats["Agronomic"]["total"]
+    disease_count = stats["Disease"]["total"]
+    field_count = stats["Field Condition"]["total"]
+    greenhouse_count = stats["Greenhouse Condition"]["total"]
+    growth_field_count = stats["Growth (Field)"]["total"]
+    growth_greenhouse_count = stats["Growth (Greenhouse)"]["total"]
+    yield_field_count = stats["Yield (Field)"]["total"]
+    yield_greenhouse_count = stats["Yield (Greenhouse)"]["total"]
 
+    total_records = sum(form["total"] for form in stats.values())
+
+    unsynced_counts = {label: form["unsynced"] for label, form in stats.items()}
+
+    # --- Background sync queue (outbox counts; worker state added at render) ---
+    queued, retrying = db.session.query(
+        func.count(SyncOutbox.id),
+        func.coalesce(func.sum(case((SyncOutbox.attempts > 0, 1), else_=0)), 0),
+    ).one()
+    sync_queue = {"queued": queued, "retrying": retrying}
 
     # --- Latest entry timestamp ---
-    last_entry_times = []
-    for model in [
-        AgronomicRecord, DiseaseRecord, FieldConditionRecord,
-        GreenhouseConditionRecord, GrowthFieldRecord,
-        GrowthGreenhouseRecord, YieldFieldRecord, YieldGreenhouseRecord
-    ]:
-        result = db.session.query(model.created_at).order_by(model.created_at.desc()).first()
-        if result:
-            last_entry_times.append(result[0])
+    last_entry_times = [form["last_created_at"] for form in stats.values() if form["last_created_at"]]
     last_entry = max(last_entry_times).strftime("%Y-%m-%d %H:%M") if last_entry_times else None
 
     # --- Recent entries (normalized for template) ---
-    recent_entries = []
-
-    def add_entries(model, form_type, identifier_field=None, observer_field=None):
-        rows = db.session.query(model).order_by(model.created_at.desc()).limit(3).all()
-        for row in rows:
-            identifier = getattr(row, identifier_field, None) if identifier_field else "-"
-            observer = getattr(row, observer_field, None) if observer_field else "-"
-            recent_entries.append({
-                "form_type": form_type,
-                "identifier": identifier or "—",
-                "observer": observer or "—",
-                "date": row.created_at.strftime("%Y-%m-%d %H:%M")
-            })
-
-    # Map each model to a label + fields
-    add_entries(AgronomicRecord, "Agronomic", "plot_number", "observer")
-    add_entries(DiseaseRecord, "Disease", "plot_number")
-    add_entries(FieldConditionRecord, "Field Condition", "location")
-    add_entries(GreenhouseConditionRecord, "Greenhouse Condition", "location")
-    add_entries(GrowthFieldRecord, "Growth (Field)", "plot_number")
-    add_entries(GrowthGreenhouseRecord, "Growth (Greenhouse)", "greenhouse_id")
-    add_entries(YieldFieldRecord, "Yield (Field)", "plot_number")
-    add_entries(YieldGreenhouseRecord, "Yield (Greenhouse)", "greenhouse_id")
-
-    # sort across all models and take top 5
-    recent_entries = sorted(recent_entries, key=lambda x: x["date"], reverse=True)[:5]
-
-    return render_template(
-        "dashboard.html",
+    recent_entries = [format_activity(entry) for entry in recent_activity(5)]
+
+    return dict(
         total_genotypes=agronomic_count,
         total_records=total_records,
         last_entry=last_entry,
@@ -107,5 +104,37 @@ def dashboard():
         growth_greenhouse_count=growth_greenhouse_count,
         yield_field_count=yield_field_count,
         yield_greenhouse_count=yield_greenhouse_count,
-        unsynced_counts=unsynced_counts
+        unsynced_counts=unsynced_counts,
+        sync_queue=sync_queue
     )
+
+
+def format_activity(entry):
+    return {
+        "form_type": entry["form_type"],
+        "identifier": entry["identifier"] or "—",
+        "observer": entry["observer"] or "—",
+        "date": entry["created_at"].strftime("%Y-%m-%d %H:%M") if entry["created_at"] else "—",
+    }
+
+
+@bp.route("/activity")
+def activity():
+    """Paginated JSON feed of recent entries across all forms (?page=1&per_page=20)."""
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 100)
+
+    with read_session() as session:
+        # One extra row tells whether another page exists
+        rows = recent_activity(per_page + 1, offset=(page - 1) * per_page, session=session)
+
+    items = [
+        {**row, "created_at": row["created_at"].isoformat() if row["created_at"] else None}
+        for row in rows[:per_page]
+    ]
+    return jsonify({
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(rows) > per_page,
+    })
@@ -0,0 +1,90 @@
+import os, json, re
+from gspread.utils import rowcol_to_a1
+from config import user_dir
+from rate_limit import sheets_read
+
+INDEX_DIR = os.path.join(user_dir, "sheet_index")
+
+
+def _index_path(sheet_name, namespace):
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", sheet_name).strip("_")
+    return os.path.join(INDEX_DIR, namespace, f"{safe_name}.json")
+
+
+class SheetIdIndex:
+    """
+    Locally persisted list of the record ids already present in a worksheet,
+    in sheet row order. Lets duplicate checks be set lookups instead of
+    downloading the whole id column for every record.
+    """
+
+    def __init__(self, sheet_name, namespace, id_col=None, ids=None):
+        self.sheet_name = sheet_name
+        self.namespace = namespace  # sync backend name
+        self.id_col = id_col
+        self.ids = list(ids or [])
+        self._id_set = set(self.ids)
+
+    @classmethod
+    def load(cls, sheet_name, namespace):
+        path = _index_path(sheet_name, namespace)
+        if not os.path.exists(path):
+            return cls(sheet_name, namespace)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(sheet_name, namespace, data.get("id_col"), data.get("ids"))
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable sheet index for {sheet_name}: {e}")
+            return cls(sheet_name, namespace)
+
+    def save(self):
+        path = _index_path(self.sheet_name, self.namespace)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"id_col": self.id_col, "ids": self.ids}, f)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, record_id):
+        return str(record_id) in self._id_set
+
+    def __len__(self):
+        return len(self.ids)
+
+    def in_sync_with(self, sheet, id_col):
+        """
+        Cheap drift check: the id column must end exactly at the last indexed id.
+        Reads two cells instead of the whole column.
+        """
+        if self.id_col != id_col:
+            return False
+        last_row = len(self.ids) + 1  # header row + indexed rows
+        expected = self.ids[-1] if self.ids else "id"
+        probe_range = f"{rowcol_to_a1(last_row, id_col)}:{rowcol_to_a1(last_row + 1, id_col)}"
+        cells = sheets_read(sheet.get, probe_range)
+        values = [row[0] if row else "" for row in cells]
+        while values and values[-1] == "":
+            values.pop()
+        return values == [expected]
+
+    def rebuild(self, sheet, id_col):
+        """Reload the id column from the sheet and persist it."""
+        column = sheets_read(sheet.col_values, id_col)
+        self.id_col = id_col
+        self.ids = column[1:]  # drop header
+        self._id_set = set(self.ids)
+        self.save()
+        print(f"Rebuilt id index for {self.sheet_name}: {len(self.ids)} rows")
+
+    def ensure_fresh(self, sheet, id_col):
+        if not self.in_sync_with(sheet, id_col):
+            self.rebuild(sheet, id_col)
+
+    def extend(self, record_ids):
+        """Record ids just appended to the sheet, then persist."""
+        for record_id in record_ids:
+            record_id = str(record_id)
+            self.ids.append(record_id)
+            self._id_set.add(record_id)
+        self.save()
@@ -1,44 +1,90 @@
-import os, sys, json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import threading
 from sqlalchemy.inspection import inspect
 from db import db
-from config import GOOGLE_SHEET_ID
+from models import SyncCheckpoint, unsynced
+from stats import adjust_form_stats
+from config import SHEETS_BATCH_SIZE
+from gspread.utils import rowcol_to_a1
+from sheet_index import SheetIdIndex
+from rate_limit import sheets_read, sheets_write, is_retryable
+from sync_backends import get_backend
 
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
+DEFAULT_EXCLUDE_FIELDS = ["created_at", "updated_at", "synced"]
 
-def get_gspread_client():
+# Header rows cached per worksheet, guarded for the background sync threads
+_cache_lock = threading.RLock()
+_headers = {}
+# One lock per worksheet so concurrent syncs can't append the same rows twice
+_sheet_locks = {}
+
+
+def reset_sheets_cache():
+    """Drop cached handles and headers (e.g. after auth or sheet errors)."""
+    with _cache_lock:
+        get_backend().reset()
+        _headers.clear()
+
+
+def get_worksheet(sheet_name):
+    """Worksheet handle from the active sync backend, opened once per process."""
+    return get_backend().worksheet(sheet_name)
+
+
+def sheet_lock(sheet_name):
+    with _cache_lock:
+        return _sheet_locks.setdefault(sheet_name, threading.RLock())
+
+
+def sheet_columns(model, exclude_fields=None):
+    """Column names pushed to Sheets for a model, in mapper order."""
+    if exclude_fields is None:
+        exclude_fields = DEFAULT_EXCLUDE_FIELDS
+    mapper = inspect(model)
+    return [c.key for c in mapper.columns if c.key not in exclude_fields]
+
+
+def sheet_layout(sheet, sheet_name, columns):
     """
-    Get an authorized gspread client.
-    - On Render: uses GOOGLE_CREDENTIALS env var (full JSON string).
-    - On Desktop/EXE: falls back to credentials.json file.
+    Header-ordered column layout for a worksheet, fetched once and cached.
+    Creates headers on an empty sheet and appends any model columns the sheet
+    lacks, so rows are always written in the sheet's own column order.
+    Sheet columns unknown to the model map to None (left blank).
     """
-    creds_json = os.getenv("GOOGLE_CREDENTIALS")
-    if creds_json:
-        try:
-            creds_dict = json.loads(creds_json)
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-            print("Google credentials loaded from environment variable")
-        except Exception as e:
-            raise RuntimeError(f"Failed to load GOOGLE_CREDENTIALS from env: {e}")
-    else:
-        # Local fallback for dev or EXE builds
-        if getattr(sys, "frozen", False):
-            base_path = sys._MEIPASS
+    headers = _headers.get(sheet_name)
+    if headers is None:
+        headers = sheets_read(sheet.row_values, 1)
+        if not headers:
+            sheets_write(sheet.insert_row, columns, 1)
+            headers = list(columns)
         else:
-            base_path = os.path.abspath(os.path.dirname(__file__))
-        cred_path = os.path.join(base_path, "credentials.json")
-
-        if not os.path.exists(cred_path):
-            raise FileNotFoundError("No GOOGLE_CREDENTIALS env var and no credentials.json file found")
+            missing = [c for c in columns if c not in headers]
+            extra = [h for h in headers if h not in columns]
+            if missing or extra or headers[:len(columns)] != columns:
+                print(f"Header drift in {sheet_name}: missing={missing} extra={extra}; remapping columns")
+            if missing:
+                needed = len(headers) + len(missing)
+                if needed > sheet.col_count:
+                    sheets_write(sheet.add_cols, needed - sheet.col_count)
+                sheets_write(sheet.update, values=[missing], range_name=rowcol_to_a1(1, len(headers) + 1))
+                headers = headers + missing
+        _headers[sheet_name] = headers
+    return [h if h in columns else None for h in headers]
 
-        creds = ServiceAccountCredentials.from_json_keyfile_name(cred_path, scope)
-        print("DEBUG: GOOGLE_CREDENTIALS exists?", bool(os.getenv("GOOGLE_CREDENTIALS")))
 
-    return gspread.authorize(creds)
+def serialize_record(model_instance, columns):
+    """Build a row of stringified values to match Google Sheets."""
+    row = []
+    for col in columns:
+        val = getattr(model_instance, col) if col else None
+        if col == "synced":
+            row.append("TRUE" if val else "FALSE")
+        elif val is None:
+            row.append("")
+        elif hasattr(val, "isoformat"):
+            row.append(val.isoformat())
+        else:
+            row.append(str(val))
+    return row
 
 
 def sync_to_sheets(model_instance, sheet_name, exclude_fields=None):
@@ -46,48 +92,180 @@ def sync_to_sheets(model_instance, sheet_name, exclude_fields=None):
     Sync a SQLAlchemy record to Google Sheets.
     Ensures headers exist, skips duplicates by record id.
     """
-    if exclude_fields is None:
-        exclude_fields = ["created_at", "updated_at", "synced"]
-
     try:
-        mapper = inspect(model_instance.__class__)
-        columns = [c.key for c in mapper.columns if c.key not in exclude_fields]
-
-        client = get_gspread_client()
-        sheet = client.open_by_key(GOOGLE_SHEET_ID).worksheet(sheet_name)
-
-        # Ensure headers
-        existing_headers = sheet.row_values(1)
-        if not existing_headers:
-            sheet.insert_row(columns, 1)
-
-        # Build row (stringified values to match Google Sheets)
-        row = []
-        for col in columns:
-            val = getattr(model_instance, col)
-            if col == "synced":
-                row.append("TRUE" if val else "FALSE")
-            elif val is None:
-                row.append("")
-            elif hasattr(val, "isoformat"):
-                row.append(val.isoformat())
-            else:
-                row.append(str(val))
-
-        # Check for duplicates by ID (assumes 'id' is in columns)
-        record_id = str(getattr(model_instance, "id", None))
-        if record_id:
-            all_ids = sheet.col_values(columns.index("id") + 1)  # +1 because Sheets cols are 1-based
-            if record_id in all_ids:
-                print(f"Skipping duplicate for {model_instance.__class__.__name__} id={record_id}")
+        columns = sheet_columns(model_instance.__class__, exclude_fields)
+
+        with sheet_lock(sheet_name):
+            sheet = get_worksheet(sheet_name)
+
+            # Ensure headers and match the sheet's column order
+            layout = sheet_layout(sheet, sheet_name, columns)
+            id_col = layout.index("id") + 1  # +1 because Sheets cols are 1-based
+
+            row = serialize_record(model_instance, layout)
+
+            # Check for duplicates against the local id index
+            index = SheetIdIndex.load(sheet_name, get_backend().name)
+            index.ensure_fresh(sheet, id_col)
+            if model_instance.id in index:
+                print(f"Skipping duplicate for {model_instance.__class__.__name__} id={model_instance.id}")
                 return "already"
 
-        # Append row
-        sheet.append_row(row, value_input_option="USER_ENTERED")
-        return True
+            # Append row
+            sheets_write(sheet.append_row, row, value_input_option="USER_ENTERED")
+            index.extend([model_instance.id])
+            return True
 
     except Exception as e:
         print(f"Error syncing {model_instance.__class__.__name__} to {sheet_name}: {e}")
+        if not is_retryable(e):
+            reset_sheets_cache()
         return False
 
 
+def sync_batch_to_sheets(records, sheet_name, exclude_fields=None, batch_size=None):
+    """
+    Sync many records of one model to a worksheet.
+    Opens the worksheet and reads headers/ids once, then pushes the new rows
+    in chunked append_rows calls.
+
+    Returns (synced_ids, error): ids now present in the sheet (appended or
+    already there) and the error message that stopped the batch, if any.
+    """
+    if not records:
+        return [], None
+    if batch_size is None:
+        batch_size = SHEETS_BATCH_SIZE
+
+    model = records[0].__class__
+    synced_ids = []
+    try:
+        columns = sheet_columns(model, exclude_fields)
+
+        with sheet_lock(sheet_name):
+            sheet = get_worksheet(sheet_name)
+
+            # Ensure headers and match the sheet's column order
+            layout = sheet_layout(sheet, sheet_name, columns)
+            id_col = layout.index("id") + 1  # +1 because Sheets cols are 1-based
+
+            # Ids already in the sheet, from the local index (rebuilt on drift)
+            index = SheetIdIndex.load(sheet_name, get_backend().name)
+            index.ensure_fresh(sheet, id_col)
+
+            pending = []
+            for record in records:
+                if record.id in index:
+                    synced_ids.append(record.id)
+                else:
+                    pending.append(record)
+            if synced_ids:
+                print(f"Skipping {len(synced_ids)} {model.__name__} rows already in {sheet_name}")
+
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                rows = [serialize_record(record, layout) for record in chunk]
+                sheets_write(sheet.append_rows, rows, value_input_option="USER_ENTERED")
+                chunk_ids = [record.id for record in chunk]
+                index.extend(chunk_ids)
+                synced_ids.extend(chunk_ids)
+
+        return synced_ids, None
+
+    except Exception as e:
+        print(f"Error syncing {model.__name__} batch to {sheet_name}: {e}")
+        if not is_retryable(e):
+            reset_sheets_cache()
+        return synced_ids, str(e)
+
+
+def mark_synced(model, ids, batch_size=500):
+    """Flag records as synced with bulk UPDATEs (caller commits)."""
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        updated += (
+            db.session.query(model)
+            .filter(model.id.in_(chunk), unsynced(model))
+            .update({"synced": True}, synchronize_session=False)
+        )
+    if updated:
+        # Bulk UPDATEs bypass the mapper events that maintain form_stats
+        adjust_form_stats(db.session.connection(), model, unsynced_delta=-updated)
+    return updated
+
+
+def sync_pending(model, sheet_name, chunk_size=None):
+    """
+    Stream the unsynced rows of a model to its worksheet in fixed-size chunks,
+    committing the synced flags after every pushed chunk so memory stays flat.
+    A SyncCheckpoint records the cursor and the chunk in flight; a run that
+    died midway resumes from that chunk (the id index skips rows that already
+    reached the sheet).
+    Returns (synced_count, error).
+    """
+    if chunk_size is None:
+        chunk_size = SHEETS_BATCH_SIZE
+
+    with sheet_lock(sheet_name):
+        checkpoint = db.session.get(SyncCheckpoint, sheet_name)
+        cursor = 0
+        if checkpoint is not None:
+            cursor = checkpoint.last_id or 0
+            if checkpoint.inflight_from is not None:
+                print(f"Resuming {sheet_name} from id={checkpoint.inflight_from} after an interrupted sync")
+                cursor = checkpoint.inflight_from - 1
+
+        synced_total = 0
+        while True:
+            # Keyset pages rather than one long cursor: committing between chunks
+            # would otherwise invalidate an open yield_per result
+            ids = (
+                db.session.query(model.id)
+                .filter(unsynced(model), model.id > cursor)
+                .order_by(model.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not ids:
+                break
+
+            if checkpoint is None:
+                checkpoint = SyncCheckpoint(sheet_name=sheet_name)
+                db.session.add(checkpoint)
+            checkpoint.inflight_from = ids[0].id
+            checkpoint.inflight_to = ids[-1].id
+            db.session.commit()
+
+            # Rows are loaded after the checkpoint commit: loading them first
+            # would expire every object and reload them one SELECT at a time
+            chunk = (
+                db.session.query(model)
+                .filter(unsynced(model), model.id.between(ids[0].id, ids[-1].id))
+                .order_by(model.id)
+                .all()
+            )
+
+            synced_ids, error = sync_batch_to_sheets(chunk, sheet_name, batch_size=chunk_size)
+            mark_synced(model, synced_ids)
+            synced_total += len(synced_ids)
+            if error:
+                db.session.commit()  # keep what made it; checkpoint stays in flight
+                print(f"Stopped {sheet_name} at id={ids[0].id}, synced {synced_total} rows: {error}")
+                return synced_total, error
+
+            cursor = ids[-1].id
+            checkpoint.last_id = cursor
+            checkpoint.inflight_from = None
+            checkpoint.inflight_to = None
+            db.session.commit()
+            print(f"  → {sheet_name}: synced {len(synced_ids)} rows up to id={cursor}")
+
+        # Run complete: the next one starts from the first pending row again
+        if checkpoint is not None:
+            db.session.delete(checkpoint)
+            db.session.commit()
+
+    if synced_total:
+        print(f"Finished {sheet_name}, synced {synced_total} rows")
+    return synced_total, None
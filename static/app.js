@@ -1,5 +1,6 @@
 document.addEventListener("DOMContentLoaded", () => {
-  document.querySelectorAll("form").forEach(form => {
+  // Only the data-entry wizards: other forms (e.g. file import) post normally
+  document.querySelectorAll("form#wizardForm").forEach(form => {
     form.addEventListener("submit", function (e) {
       e.preventDefault();
 
@@ -11,13 +12,69 @@ document.addEventListener("DOMContentLoaded", () => {
           .then(r => console.log("Synced online:", r))
           .catch(err => console.error("Online save failed:", err));
       } else {
-        saveToIndexedDB({ url, data });
+        // Idempotency key: lets the server skip this entry if it is replayed twice
+        saveToIndexedDB({ url, data, key: newSubmissionKey() });
         alert("Saved offline — will sync later");
       }
     });
   });
+
+  const downloadAll = document.getElementById("downloadAllBtn");
+  if (downloadAll) {
+    downloadAll.addEventListener("click", e => {
+      e.preventDefault();
+      startExportJob(downloadAll);
+    });
+  }
 });
 
+// Builds the workbook in the background and polls its progress; falls back
+// to the direct download link if the job cannot be started.
+function startExportJob(button) {
+  if (button.classList.contains("disabled")) return;
+  const label = button.textContent;
+  const finish = () => {
+    button.textContent = label;
+    button.classList.remove("disabled");
+  };
+  button.classList.add("disabled");
+  button.textContent = "Preparing…";
+
+  fetch(button.dataset.jobUrl, { method: "POST" })
+    .then(r => (r.ok ? r.json() : Promise.reject(r.status)))
+    .then(job => {
+      const poll = () => {
+        fetch(job.status_url)
+          .then(r => (r.ok ? r.json() : Promise.reject(r.status)))
+          .then(status => {
+            if (status.status === "done") {
+              finish();
+              window.location = status.download_url;
+            } else if (status.status === "failed") {
+              finish();
+              alert("Export failed: " + (status.error || "unknown error"));
+            } else {
+              if (status.total) {
+                button.textContent = "Preparing… " + Math.floor(100 * status.rows / status.total) + "%";
+              }
+              setTimeout(poll, 1000);
+            }
+          })
+          .catch(err => {
+            finish();
+            console.error("Export status failed:", err);
+            alert("Lost track of the export — please try again");
+          });
+      };
+      poll();
+    })
+    .catch(err => {
+      console.error("Export job failed to start:", err);
+      finish();
+      window.location = button.href;
+    });
+}
+
 function saveToIndexedDB(record) {
   let request = indexedDB.open("FieldApp", 1);
   request.onupgradeneeded = e => {
@@ -33,3 +90,8 @@ function saveToIndexedDB(record) {
     console.log("Saved to IndexedDB:", record);
   };
 }
+
+function newSubmissionKey() {
+  if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 12);
+}
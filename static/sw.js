@@ -27,26 +27,80 @@ self.addEventListener("sync", event => {
   }
 });
 
+// Flush the whole offline queue in one request. The server skips keys it
+// has already stored, so entries are only removed once it confirms them;
+// anything rejected or unsent stays queued for the next sync.
 function syncPendingForms() {
+  return openQueue().then(db =>
+    readQueue(db).then(async entries => {
+      if (!entries.length) return;
+
+      const submissions = entries.map(({ value }) => ({
+        key: value.key,
+        url: value.url,
+        data: value.data
+      }));
+      const response = await fetch("/form/replay", {
+        method: "POST",
+        credentials: "same-origin",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ submissions })
+      });
+      if (!response.ok) throw new Error(`Replay failed: ${response.status}`);
+      const result = await response.json();
+
+      const stored = new Set([...result.accepted, ...result.duplicates]);
+      result.rejected.forEach(r => console.error("Replay rejected:", r.key, r.error));
+      await removeFromQueue(
+        db,
+        entries.filter(({ value }) => stored.has(value.key)).map(({ id }) => id)
+      );
+    })
+  );
+}
+
+function openQueue() {
   return new Promise((resolve, reject) => {
-    let request = indexedDB.open("FieldApp", 1);
-    request.onsuccess = e => {
-      let db = e.target.result;
-      let tx = db.transaction("pending", "readwrite");
-      let store = tx.objectStore("pending");
-      let getAll = store.getAll();
-
-      getAll.onsuccess = async () => {
-        for (let record of getAll.result) {
-          await fetch(record.url, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify(record.data)
-          }).catch(err => console.error("Sync failed:", err));
-        }
-        store.clear();
-        resolve();
-      };
+    const request = indexedDB.open("FieldApp", 1);
+    request.onupgradeneeded = e => {
+      const db = e.target.result;
+      if (!db.objectStoreNames.contains("pending")) {
+        db.createObjectStore("pending", { autoIncrement: true });
+      }
     };
+    request.onsuccess = e => resolve(e.target.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+// [{ id, value }] for every queued entry; entries saved before keys existed get one now
+function readQueue(db) {
+  return new Promise((resolve, reject) => {
+    const entries = [];
+    const tx = db.transaction("pending", "readwrite");
+    tx.objectStore("pending").openCursor().onsuccess = e => {
+      const cursor = e.target.result;
+      if (!cursor) return;
+      const value = cursor.value;
+      if (!value.key) {
+        value.key = crypto.randomUUID();
+        cursor.update(value);
+      }
+      entries.push({ id: cursor.key, value });
+      cursor.continue();
+    };
+    tx.oncomplete = () => resolve(entries);
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+function removeFromQueue(db, ids) {
+  return new Promise((resolve, reject) => {
+    if (!ids.length) return resolve();
+    const tx = db.transaction("pending", "readwrite");
+    const store = tx.objectStore("pending");
+    ids.forEach(id => store.delete(id));
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
   });
 }
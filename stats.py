@@ -0,0 +1,175 @@
+from sqlalchemy import select, literal, null, func, case, union_all, insert, update, delete, event, inspect
+from sqlalchemy.exc import IntegrityError
+from db import db
+import dashboard_cache
+from models import FORM_MODELS, FormStats, unsynced
+
+LABEL_BY_MODEL = {model: label for model, label in FORM_MODELS}
+form_stats = FormStats.__table__
+
+
+def form_statistics():
+    """
+    Total, unsynced and latest created_at for every form in one
+    UNION ALL aggregate statement (full scan; used to rebuild form_stats).
+    Returns {form label: {"total", "unsynced", "last_created_at"}}.
+    """
+    query = union_all(*[
+        select(
+            literal(label).label("form"),
+            func.count(model.id).label("total"),
+            func.coalesce(func.sum(case((unsynced(model), 1), else_=0)), 0).label("unsynced"),
+            func.max(model.created_at).label("last_created_at"),
+        )
+        for model, label in FORM_MODELS
+    ])
+    stats = {}
+    for row in db.session.execute(query):
+        stats[row.form] = {
+            "total": row.total,
+            "unsynced": row.unsynced,
+            "last_created_at": row.last_created_at,
+        }
+    return stats
+
+
+# Identifier and observer columns shown for each form in the activity feed
+ACTIVITY_FIELDS = {
+    "Agronomic": ("plot_number", "observer"),
+    "Disease": ("plot_number", None),
+    "Field Condition": ("location", None),
+    "Greenhouse Condition": ("location", None),
+    "Growth (Field)": ("plot_number", None),
+    "Growth (Greenhouse)": ("greenhouse_id", None),
+    "Yield (Field)": ("plot_number", None),
+    "Yield (Greenhouse)": ("greenhouse_id", None),
+}
+
+
+def recent_activity(limit=5, offset=0, session=None):
+    """
+    Newest entries across all forms, newest first, in one UNION ALL statement.
+    Each branch projects only form_type, id, identifier, observer and created_at
+    and is cut to limit + offset rows via the created_at index before merging.
+    id breaks created_at ties (e.g. a bulk import) so pages never overlap.
+    Returns a list of dicts.
+    """
+    session = session or db.session
+    branches = []
+    for model, label in FORM_MODELS:
+        identifier_field, observer_field = ACTIVITY_FIELDS[label]
+        branch = (
+            select(
+                literal(label).label("form_type"),
+                model.id.label("id"),
+                getattr(model, identifier_field).label("identifier"),
+                (getattr(model, observer_field) if observer_field else null()).label("observer"),
+                model.created_at.label("created_at"),
+            )
+            .order_by(model.created_at.desc(), model.id.desc())
+            .limit(limit + offset)
+            .subquery()
+        )
+        # SQLite rejects ORDER BY/LIMIT directly inside a compound select
+        branches.append(select(*branch.c))
+    feed = union_all(*branches).subquery()
+    query = (
+        select(*feed.c)
+        .order_by(feed.c.created_at.desc(), feed.c.form_type, feed.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [dict(row._mapping) for row in session.execute(query)]
+
+
+def read_form_stats(session=None):
+    """Dashboard numbers from the form_stats table: one small read, O(1) in table sizes."""
+    session = session or db.session
+    stats = {
+        label: {"total": 0, "unsynced": 0, "last_created_at": None}
+        for _, label in FORM_MODELS
+    }
+    for row in session.query(FormStats):
+        stats[row.form] = {
+            "total": row.total,
+            "unsynced": row.unsynced,
+            "last_created_at": row.last_created_at,
+        }
+    return stats
+
+
+def rebuild_form_stats():
+    """Recount every form from the record tables and overwrite form_stats."""
+    stats = form_statistics()
+    db.session.query(FormStats).delete()
+    db.session.add_all(FormStats(form=label, **values) for label, values in stats.items())
+    db.session.commit()
+    return stats
+
+
+def ensure_form_stats():
+    """
+    Seed form_stats on first start (or after forms were added or removed).
+    Every worker process runs this at boot: each missing form is inserted in
+    its own transaction, and a row another worker inserted first is kept.
+    """
+    labels = {label for _, label in FORM_MODELS}
+    present = set(db.session.scalars(select(form_stats.c.form)))
+    if present - labels:
+        db.session.execute(delete(form_stats).where(form_stats.c.form.notin_(labels)))
+        db.session.commit()
+    missing = labels - present
+    if not missing:
+        return
+
+    stats = form_statistics()
+    for label in sorted(missing):
+        try:
+            db.session.execute(insert(form_stats).values(form=label, **stats[label]))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # seeded by another worker meanwhile
+
+
+def adjust_form_stats(connection, model, total=0, unsynced_delta=0, created_at=None):
+    """Apply a delta to a form's counters on the given connection/transaction."""
+    values = {
+        "total": form_stats.c.total + total,
+        "unsynced": form_stats.c.unsynced + unsynced_delta,
+    }
+    if created_at is not None:
+        values["last_created_at"] = case(
+            (form_stats.c.last_created_at.is_(None), created_at),
+            (form_stats.c.last_created_at < created_at, created_at),
+            else_=form_stats.c.last_created_at,
+        )
+    connection.execute(
+        update(form_stats).where(form_stats.c.form == LABEL_BY_MODEL[model]).values(**values)
+    )
+    dashboard_cache.mark_changed(connection)
+
+
+# --- Keep form_stats current on every ORM write ---
+
+def _after_insert(mapper, connection, target):
+    adjust_form_stats(connection, type(target), total=1,
+                      unsynced_delta=0 if target.synced else 1, created_at=target.created_at)
+
+
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.synced.history
+    if history.has_changes():
+        was_synced = bool(history.deleted and history.deleted[0])
+        if was_synced != bool(target.synced):
+            adjust_form_stats(connection, type(target), unsynced_delta=1 if was_synced else -1)
+
+
+def _after_delete(mapper, connection, target):
+    adjust_form_stats(connection, type(target), total=-1,
+                      unsynced_delta=0 if target.synced else -1)
+
+
+for _model, _ in FORM_MODELS:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
@@ -0,0 +1,363 @@
+"""
+Sync backends: where sheets_utils pushes worksheet rows.
+
+Each backend hands out worksheet-like objects exposing the small part of the
+gspread Worksheet API that sync uses (row_values, col_values, get, insert_row,
+update, add_cols, col_count, append_row, append_rows):
+- GspreadBackend: the live Google Sheet (GOOGLE_SHEET_ID).
+- FakeSheetsBackend: in-process stand-in with latency, quota errors and call
+  counters, for benchmarks and CI without network.
+- FileSinkBackend: one CSV or Parquet file per worksheet.
+"""
+import os, sys, json, re, csv, time, random, threading
+from collections import Counter, deque
+import gspread
+from gspread.utils import a1_to_rowcol
+from oauth2client.service_account import ServiceAccountCredentials
+import config
+import rate_limit
+
+scope = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def load_credentials():
+    """
+    Load service-account credentials.
+    - On Render: uses GOOGLE_CREDENTIALS env var (full JSON string).
+    - On Desktop/EXE: falls back to credentials.json file.
+    """
+    creds_json = os.getenv("GOOGLE_CREDENTIALS")
+    if creds_json:
+        try:
+            creds_dict = json.loads(creds_json)
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+            print("Google credentials loaded from environment variable")
+        except Exception as e:
+            raise RuntimeError(f"Failed to load GOOGLE_CREDENTIALS from env: {e}")
+    else:
+        # Local fallback for dev or EXE builds
+        if getattr(sys, "frozen", False):
+            base_path = sys._MEIPASS
+        else:
+            base_path = os.path.abspath(os.path.dirname(__file__))
+        cred_path = os.path.join(base_path, "credentials.json")
+
+        if not os.path.exists(cred_path):
+            raise FileNotFoundError("No GOOGLE_CREDENTIALS env var and no credentials.json file found")
+
+        creds = ServiceAccountCredentials.from_json_keyfile_name(cred_path, scope)
+        print("DEBUG: GOOGLE_CREDENTIALS exists?", bool(os.getenv("GOOGLE_CREDENTIALS")))
+
+    return creds
+
+
+class SyncBackend:
+    """Base backend: caches one worksheet handle per sheet name."""
+    name = None
+    rate_limited = True  # route calls through the Sheets quota limiter
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._worksheets = {}
+
+    def open_worksheet(self, sheet_name):
+        raise NotImplementedError
+
+    def worksheet(self, sheet_name):
+        """Open a worksheet once and reuse the handle."""
+        with self._lock:
+            sheet = self._worksheets.get(sheet_name)
+            if sheet is None:
+                sheet = self.open_worksheet(sheet_name)
+                self._worksheets[sheet_name] = sheet
+            return sheet
+
+    def reset(self):
+        """Drop cached handles (e.g. after auth or sheet errors)."""
+        with self._lock:
+            self._worksheets.clear()
+
+
+class GspreadBackend(SyncBackend):
+    """
+    Live Google Sheets. One authorized client and spreadsheet handle per
+    process. gspread wraps the credentials in google-auth ones, whose
+    session refreshes the access token itself.
+    """
+    name = "gspread"
+
+    def __init__(self, sheet_id=None):
+        super().__init__()
+        self.sheet_id = sheet_id or config.GOOGLE_SHEET_ID
+        self._client = None
+        self._spreadsheet = None
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = gspread.authorize(load_credentials())
+            return self._client
+
+    def worksheet(self, sheet_name):
+        self.client()
+        return super().worksheet(sheet_name)
+
+    def open_worksheet(self, sheet_name):
+        if self._spreadsheet is None:
+            self._spreadsheet = rate_limit.sheets_read(self._client.open_by_key, self.sheet_id)
+        return rate_limit.sheets_read(self._spreadsheet.worksheet, sheet_name)
+
+    def reset(self):
+        with self._lock:
+            # Re-authorizes on next use (after auth or sheet errors)
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets.clear()
+
+
+# --- In-process stand-in ---
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class FakeAPIError(Exception):
+    """Mimics a gspread APIError carrying an HTTP response."""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code}: {message}")
+        self.response = _FakeResponse(status_code)
+
+
+def _strip_trailing(values):
+    values = list(values)
+    while values and values[-1] in ("", None):
+        values.pop()
+    return values
+
+
+class FakeWorksheet:
+    """In-memory grid with the worksheet methods sync relies on."""
+
+    def __init__(self, title, backend=None, col_count=26):
+        self.title = title
+        self.col_count = col_count
+        self.rows = []
+        self._backend = backend
+
+    def _hit(self, method):
+        if self._backend is not None:
+            self._backend.hit(method)
+
+    def _set_cell(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+
+    def _cell(self, row, col):
+        if row > len(self.rows) or col > len(self.rows[row - 1]):
+            return ""
+        return self.rows[row - 1][col - 1]
+
+    def row_values(self, row):
+        self._hit("row_values")
+        return _strip_trailing(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._hit("col_values")
+        return _strip_trailing(self._cell(r, col) for r in range(1, len(self.rows) + 1))
+
+    def get(self, range_name):
+        self._hit("get")
+        start, _, end = range_name.partition(":")
+        first_row, first_col = a1_to_rowcol(start)
+        last_row, last_col = a1_to_rowcol(end or start)
+        values = [
+            _strip_trailing(self._cell(r, c) for c in range(first_col, last_col + 1))
+            for r in range(first_row, last_row + 1)
+        ]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def insert_row(self, values, index=1, value_input_option=None):
+        self._hit("insert_row")
+        self.rows.insert(index - 1, [str(v) for v in values])
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._hit("update")
+        first_row, first_col = a1_to_rowcol(range_name.partition(":")[0])
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._set_cell(first_row + r, first_col + c, value)
+
+    def add_cols(self, cols):
+        self._hit("add_cols")
+        self.col_count += cols
+
+    def append_row(self, values, value_input_option=None):
+        self._hit("append_row")
+        self.rows.append([str(v) for v in values])
+
+    def append_rows(self, values, value_input_option=None):
+        self._hit("append_rows")
+        self.rows.extend([str(v) for v in row] for row in values)
+
+
+class FakeSheetsBackend(SyncBackend):
+    """
+    In-process Sheets stand-in. Emulates per-call latency, a per-minute quota
+    (429 once exceeded) and random transient errors, and counts API calls.
+    """
+    name = "fake"
+
+    def __init__(self, latency_ms=0, quota_per_minute=0, error_rate=0.0, seed=None):
+        super().__init__()
+        self.latency = latency_ms / 1000.0
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self._recent = deque()
+        self._random = random.Random(seed)
+        self._sheets = {}
+
+    def open_worksheet(self, sheet_name):
+        rate_limit.sheets_read(self.hit, "worksheet")
+        return self._sheets.setdefault(sheet_name, FakeWorksheet(sheet_name, self))
+
+    def hit(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            now = time.monotonic()
+            if self.quota_per_minute:
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota_per_minute:
+                    self.calls["quota_errors"] += 1
+                    raise FakeAPIError(429, "Quota exceeded for quota metric 'Requests per minute'")
+                self._recent.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.calls["server_errors"] += 1
+                raise FakeAPIError(503, "The service is currently unavailable")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def api_calls(self):
+        return sum(n for method, n in self.calls.items() if not method.endswith("_errors"))
+
+
+# --- File sink ---
+
+class FileWorksheet(FakeWorksheet):
+    """Worksheet persisted to a CSV or Parquet file after every write."""
+
+    def __init__(self, title, path, fmt):
+        super().__init__(title)
+        self.path = path
+        self.fmt = fmt
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        if self.fmt == "parquet":
+            import pandas as pd
+            df = pd.read_parquet(self.path)
+            self.rows = [list(df.columns)] + df.astype(str).values.tolist()
+        else:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                self.rows = [row for row in csv.reader(f)]
+
+    def _save(self, appended=None):
+        if self.fmt == "parquet":
+            # Parquet files can't be appended to: rewrite the table
+            import pandas as pd
+            header = self.rows[0] if self.rows else []
+            body = [(row + [""] * len(header))[:len(header)] for row in self.rows[1:]]
+            pd.DataFrame(body, columns=header).to_parquet(self.path, index=False)
+        elif appended is not None:
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(appended)
+        else:
+            with open(self.path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(self.rows)
+
+    def insert_row(self, values, index=1, value_input_option=None):
+        super().insert_row(values, index)
+        self._save()
+
+    def update(self, values=None, range_name=None, **kwargs):
+        super().update(values, range_name)
+        self._save()
+
+    def append_row(self, values, value_input_option=None):
+        self.append_rows([values])
+
+    def append_rows(self, values, value_input_option=None):
+        rows = [[str(v) for v in row] for row in values]
+        self.rows.extend(rows)
+        self._save(appended=rows)
+
+
+class FileSinkBackend(SyncBackend):
+    """Writes each worksheet to <directory>/<sheet>.csv or .parquet."""
+    rate_limited = False
+
+    def __init__(self, directory=None, fmt="csv"):
+        super().__init__()
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported file sink format: {fmt}")
+        self.name = fmt
+        self.fmt = fmt
+        self.directory = directory or config.SYNC_FILE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def open_worksheet(self, sheet_name):
+        safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", sheet_name).strip("_")
+        return FileWorksheet(sheet_name, os.path.join(self.directory, f"{safe_name}.{self.fmt}"), self.fmt)
+
+
+# --- Active backend ---
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    name = name or config.SYNC_BACKEND
+    if name == "gspread":
+        return GspreadBackend()
+    if name == "fake":
+        return FakeSheetsBackend(
+            latency_ms=config.FAKE_SHEETS_LATENCY_MS,
+            quota_per_minute=config.FAKE_SHEETS_QUOTA_PER_MINUTE,
+            error_rate=config.FAKE_SHEETS_ERROR_RATE,
+        )
+    if name in ("csv", "parquet"):
+        return FileSinkBackend(fmt=name)
+    raise ValueError(f"Unknown SYNC_BACKEND: {name}")
+
+
+def get_backend():
+    """The process-wide sync backend, created from SYNC_BACKEND on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+            rate_limit.set_enabled(_backend.rate_limited)
+        return _backend
+
+
+def set_backend(backend):
+    """Swap the active backend (benchmarks, tests, one-off exports)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+        rate_limit.set_enabled(backend.rate_limited)
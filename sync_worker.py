@@ -0,0 +1,166 @@
+import random
+import threading
+import uuid
+from datetime import timedelta
+from sqlalchemy import or_
+from db import db
+from models import Kampala_time, SyncOutbox, FORM_MODELS
+from sheets_utils import sync_batch_to_sheets, mark_synced
+
+MODEL_BY_SHEET = {sheet: model for model, sheet in FORM_MODELS}
+
+CLAIM_LIMIT = 500        # outbox entries handled per drain pass
+CLAIM_LEASE_SECONDS = 600  # how long a claim blocks other workers
+
+
+def _now():
+    # Naive Kampala time, matching how DateTime columns are stored
+    return Kampala_time().replace(tzinfo=None)
+
+
+def enqueue(record, sheet_name):
+    """Add an outbox entry for a record (caller commits with the record)."""
+    db.session.flush()  # make sure the record has an id
+    entry = SyncOutbox(sheet_name=sheet_name, record_id=record.id, next_attempt_at=_now())
+    db.session.add(entry)
+    return entry
+
+
+class SyncWorker:
+    """
+    Background thread that drains the sync outbox to Google Sheets.
+    Failed entries are retried with exponential backoff; each entry keeps
+    its attempt count and last error.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._state = {
+            "running": False,
+            "last_run": None,
+            "last_synced": 0,
+            "last_error": None,
+        }
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._thread.start()
+        print("Background sync worker started")
+
+    def wake(self):
+        """Ask the worker to drain the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def state(self):
+        with self._lock:
+            return dict(self._state, alive=bool(self._thread and self._thread.is_alive()))
+
+    def _set_state(self, **values):
+        with self._lock:
+            self._state.update(values)
+
+    def _run(self):
+        poll_seconds = self._app.config["SYNC_POLL_SECONDS"]
+        while True:
+            self._wake.wait(timeout=poll_seconds)
+            self._wake.clear()
+            with self._app.app_context():
+                self._set_state(running=True)
+                try:
+                    # Keep draining while full batches come back
+                    while self.drain() >= CLAIM_LIMIT:
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error in sync worker: {e}")
+                    self._set_state(last_error=str(e))
+                finally:
+                    db.session.remove()
+                    self._set_state(running=False, last_run=_now())
+
+    def _claim(self):
+        """Lease due outbox entries to this pass so other workers skip them."""
+        now = _now()
+        token = str(uuid.uuid4())
+        available = or_(SyncOutbox.claimed_until.is_(None), SyncOutbox.claimed_until < now)
+        due_ids = [
+            entry_id for (entry_id,) in
+            db.session.query(SyncOutbox.id)
+            .filter(SyncOutbox.next_attempt_at <= now, available)
+            .order_by(SyncOutbox.id)
+            .limit(CLAIM_LIMIT)
+        ]
+        if not due_ids:
+            return []
+        db.session.query(SyncOutbox).filter(SyncOutbox.id.in_(due_ids), available).update(
+            {"claimed_by": token, "claimed_until": now + timedelta(seconds=CLAIM_LEASE_SECONDS)},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return db.session.query(SyncOutbox).filter_by(claimed_by=token).order_by(SyncOutbox.id).all()
+
+    def _backoff(self, attempts):
+        base = self._app.config["SYNC_RETRY_BASE_SECONDS"]
+        cap = self._app.config["SYNC_RETRY_MAX_SECONDS"]
+        delay = min(cap, base * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def drain(self):
+        """Push one batch of claimed outbox entries. Returns entries handled."""
+        entries = self._claim()
+        if not entries:
+            return 0
+
+        by_sheet = {}
+        for entry in entries:
+            by_sheet.setdefault(entry.sheet_name, []).append(entry)
+
+        synced_total = 0
+        last_error = None
+        for sheet_name, sheet_entries in by_sheet.items():
+            model = MODEL_BY_SHEET.get(sheet_name)
+            if model is None:
+                for entry in sheet_entries:
+                    db.session.delete(entry)
+                db.session.commit()
+                continue
+
+            record_ids = [entry.record_id for entry in sheet_entries]
+            records = db.session.query(model).filter(model.id.in_(record_ids)).order_by(model.id).all()
+            pending = [record for record in records if not record.synced]
+
+            synced_ids, error = sync_batch_to_sheets(pending, sheet_name)
+            mark_synced(model, synced_ids)
+
+            # Entries whose record is now in the sheet (or gone/already synced) are done
+            done_ids = set(synced_ids) | {record.id for record in records if record.synced}
+            done_ids |= set(record_ids) - {record.id for record in records}
+            now = _now()
+            for entry in sheet_entries:
+                if entry.record_id in done_ids:
+                    db.session.delete(entry)
+                else:
+                    entry.attempts += 1
+                    entry.last_error = error
+                    entry.next_attempt_at = now + self._backoff(entry.attempts)
+                    entry.claimed_by = None
+                    entry.claimed_until = None
+            db.session.commit()
+
+            synced_total += len(synced_ids)
+            if error:
+                last_error = f"{sheet_name}: {error}"
+
+        self._set_state(last_synced=synced_total, last_error=last_error)
+        if synced_total:
+            print(f"Sync worker pushed {synced_total} records")
+        return len(entries)
+
+
+worker = SyncWorker()
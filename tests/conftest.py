@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# config reads the runtime dir from HOME at import time: keep tests out of real data
+_home = tempfile.mkdtemp(prefix="datacollect-tests-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = _home
+os.environ["SYNC_BACKEND"] = "fake"
+os.environ["SYNC_WORKER_ENABLED"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from db import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def statements(app):
+    """(statement, parameters) of every SQL statement run during the test."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", record)
@@ -0,0 +1,86 @@
+"""Query-count checks for the dashboard statistics (before_cursor_execute)."""
+import pytest
+from sqlalchemy import insert
+
+from db import db
+import stats as stats_module
+from models import FORM_MODELS, DiseaseRecord, FormStats, Kampala_time
+from routes.main import dashboard_context
+from stats import ensure_form_stats, form_statistics, read_form_stats, rebuild_form_stats
+from sync_worker import worker
+
+
+@pytest.fixture
+def seeded(app):
+    for index, (model, _) in enumerate(FORM_MODELS):
+        db.session.execute(insert(model), [
+            {"crop": "Crop 1", "synced": i % 2 == 0} for i in range(index + 3)
+        ])
+    db.session.commit()
+    # Bulk INSERTs bypass the form_stats mapper events
+    rebuild_form_stats()
+
+
+def test_form_statistics_is_one_statement(seeded, statements):
+    stats = form_statistics()
+
+    assert len(statements) == 1
+    assert len(stats) == len(FORM_MODELS)
+    for index, (_, label) in enumerate(FORM_MODELS):
+        assert stats[label]["total"] == index + 3
+        assert stats[label]["unsynced"] == (index + 3) // 2
+        assert stats[label]["last_created_at"] is not None
+
+
+def test_dashboard_context_statement_count(seeded, statements):
+    # form_stats, outbox counts and the recent-entries UNION ALL: was 34
+    context = dashboard_context()
+
+    assert len(statements) == 3, [statement for statement, _ in statements]
+    assert context["total_records"] == sum(index + 3 for index in range(len(FORM_MODELS)))
+
+
+def test_form_stats_bookkeeping_matches_recount(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    client.post("/form/disease", data={"crop": "Crop 1", "plot_number": "P1"})
+
+    assert db.session.query(DiseaseRecord).count() == 1
+    assert read_form_stats() == form_statistics()
+
+
+def test_idle_worker_poll_keeps_the_etag(app, monkeypatch):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    first = client.get("/dashboard")
+    assert first.status_code == 200
+
+    # Cache expired and the worker polled (last_run moved), but no data changed
+    monkeypatch.setitem(app.config, "DASHBOARD_CACHE_SECONDS", 0)
+    worker._set_state(last_run=Kampala_time())
+    again = client.get("/dashboard", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_form_stats_seed_is_idempotent(app, monkeypatch):
+    # Another worker seeds a form between this one's check and its insert
+    labels = [label for _, label in FORM_MODELS]
+    db.session.query(FormStats).delete()
+    db.session.commit()
+    real_statistics = stats_module.form_statistics
+
+    def racing_statistics():
+        values = real_statistics()
+        db.session.add(FormStats(form=labels[0], total=0, unsynced=0))
+        db.session.commit()
+        return values
+
+    monkeypatch.setattr(stats_module, "form_statistics", racing_statistics)
+    ensure_form_stats()
+    ensure_form_stats()
+
+    assert sorted(row.form for row in db.session.query(FormStats)) == sorted(labels)
@@ -0,0 +1,56 @@
+"""Export job TTL: expired jobs disappear, stuck jobs are reported failed."""
+import os
+from datetime import timedelta
+
+import pytest
+
+from db import db
+from export_jobs import _now
+from models import ExportJob
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    return client
+
+
+def add_job(app, job_id, status, age_seconds, tmp_path=None):
+    path = None
+    if tmp_path is not None:
+        path = str(tmp_path / f"{job_id}.xlsx")
+        with open(path, "wb") as f:
+            f.write(b"xlsx")
+    created_at = _now() - timedelta(seconds=age_seconds)
+    finished_at = created_at if status in ("done", "failed") else None
+    db.session.add(ExportJob(id=job_id, status=status, path=path,
+                             created_at=created_at, finished_at=finished_at))
+    db.session.commit()
+    return path
+
+
+def test_expired_job_is_gone(app, client, tmp_path):
+    ttl = app.config["EXPORT_JOB_TTL_SECONDS"]
+    fresh = add_job(app, "fresh", "done", 10, tmp_path)
+    old = add_job(app, "old", "done", ttl + 10, tmp_path)
+
+    assert client.get("/form/export_jobs/fresh/download").status_code == 200
+    assert client.get("/form/export_jobs/old/download").status_code == 404
+    assert client.get("/form/export_jobs/old").status_code == 404
+    assert db.session.get(ExportJob, "old") is None
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+
+@pytest.mark.parametrize("status", ["queued", "running"])
+def test_stuck_job_is_reported_failed(app, client, status):
+    add_job(app, "stuck", status, app.config["EXPORT_JOB_TTL_SECONDS"] + 10)
+
+    response = client.get("/form/export_jobs/stuck")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "failed"
+    # Still reported (so pollers stop) until a TTL after it was failed
+    assert client.get("/form/export_jobs/stuck").get_json()["status"] == "failed"
+    assert client.get("/form/export_jobs/stuck/download").status_code == 409
@@ -0,0 +1,84 @@
+"""
+EXPLAIN QUERY PLAN checks (SQLite) that the dashboard, recent-entries and
+pending-sync queries stay on their indexes once ANALYZE has run.
+"""
+import pytest
+from sqlalchemy import insert, text
+
+from db import db
+from models import FORM_MODELS, AgronomicRecord
+from routes.main import dashboard_context
+from sheets_utils import sync_pending
+from stats import recent_activity
+
+RECORD_TABLES = [model.__table__.name for model, _ in FORM_MODELS]
+
+
+@pytest.fixture
+def seeded(app):
+    # Mostly synced rows, as in a long-running deployment
+    for model, _ in FORM_MODELS:
+        db.session.execute(insert(model), [
+            {"crop": "Crop 1", "genotype": f"Genotype {i % 20}", "synced": i % 10 != 0}
+            for i in range(500)
+        ])
+    db.session.commit()
+    # With statistics the planner may prefer other indexes
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def query_plans(executed):
+    """{statement: [plan detail lines]} for the captured statements."""
+    connection = db.session.connection()
+    return {
+        statement: [
+            row[-1] for row in
+            connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters))
+        ]
+        for statement, parameters in list(executed)
+    }
+
+
+def table_lines(plans, table):
+    return [line for lines in plans.values() for line in lines if f" {table} " in f"{line} "]
+
+
+def test_dashboard_reads_records_only_through_created_at_index(seeded, statements):
+    dashboard_context()
+    plans = query_plans(statements)
+
+    for table in RECORD_TABLES:
+        lines = table_lines(plans, table)
+        assert lines, f"dashboard no longer shows recent {table} rows"
+        assert all(f"ix_{table}_created_at" in line for line in lines), lines
+
+
+@pytest.mark.parametrize("offset", [0, 40])
+def test_recent_entries_use_created_at_index(seeded, statements, offset):
+    entries = recent_activity(20, offset=offset)
+    assert len(entries) == 20
+    plans = query_plans(statements)
+
+    for table in RECORD_TABLES:
+        lines = table_lines(plans, table)
+        assert len(lines) == 1
+        assert f"INDEX ix_{table}_created_at" in lines[0]
+
+
+def test_pending_sync_uses_partial_unsynced_index(seeded, statements):
+    synced, error = sync_pending(AgronomicRecord, "Agronomic")
+    assert (synced, error) == (50, None)
+    plans = query_plans(statements)
+
+    page_queries = [
+        lines for statement, lines in plans.items()
+        if statement.startswith("SELECT agronomic_record.id") and "LIMIT" in statement
+    ]
+    assert page_queries
+    for lines in page_queries:
+        assert any("INDEX ix_agronomic_record_unsynced" in line for line in lines), lines
+
+    # No statement of the run falls back to a full table scan
+    for line in table_lines(plans, "agronomic_record"):
+        assert not (line.startswith("SCAN") and "INDEX" not in line), line
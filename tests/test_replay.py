@@ -0,0 +1,30 @@
+"""Offline replay: malformed items are rejected one by one."""
+import pytest
+
+from db import db
+from models import AgronomicRecord
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    return client
+
+
+@pytest.mark.parametrize("bad", [
+    {"form": ["agronomic"]},
+    {"form": {"key": "agronomic"}},
+    {"url": 5},
+    {"url": ["/form/agronomic"]},
+])
+def test_malformed_item_does_not_block_the_batch(client, bad):
+    good = {"key": "good", "url": "/form/agronomic", "data": {"crop": "Crop 1"}}
+    response = client.post("/form/replay", json=[good, dict(bad, key="bad", data={"crop": "Crop 1"})])
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["accepted"] == ["good"]
+    assert result["rejected"] == [{"key": "bad", "error": "unknown form"}]
+    assert db.session.query(AgronomicRecord).count() == 1